@@ -0,0 +1,33 @@
+"""Add client_rules snapshot table
+
+Revision ID: 7c1d2e4f9a10
+Revises: 2fef525ef568
+Create Date: 2026-10-17 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d2e4f9a10'
+down_revision: Union[str, None] = '2fef525ef568'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are materialized by the core routers on write, or lazily by the
+    # agent on the first RULES lookup of a client, so no backfill is needed.
+    op.create_table(
+        'client_rules',
+        sa.Column('client_id', sa.Integer(), sa.ForeignKey('clients.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('document', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('client_rules')
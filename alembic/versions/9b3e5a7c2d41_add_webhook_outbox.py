@@ -0,0 +1,45 @@
+"""Add webhook_outbox table
+
+Revision ID: 9b3e5a7c2d41
+Revises: 7c1d2e4f9a10
+Create Date: 2026-10-17 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e5a7c2d41'
+down_revision: Union[str, None] = '7c1d2e4f9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'webhook_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_webhook_outbox_id', 'webhook_outbox', ['id'])
+    # Only pending rows are ever claimed; the partial index stays small
+    op.create_index(
+        'ix_webhook_outbox_pending', 'webhook_outbox', ['next_attempt_at'],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_outbox_pending', table_name='webhook_outbox')
+    op.drop_index('ix_webhook_outbox_id', table_name='webhook_outbox')
+    op.drop_table('webhook_outbox')
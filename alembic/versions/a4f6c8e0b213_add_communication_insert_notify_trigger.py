@@ -0,0 +1,67 @@
+"""Add NOTIFY trigger for inserted communication rows
+
+Revision ID: a4f6c8e0b213
+Revises: 9b3e5a7c2d41
+Create Date: 2026-10-17 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f6c8e0b213'
+down_revision: Union[str, None] = '9b3e5a7c2d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Create the trigger function. The payload carries the whole row when it
+    #    fits in a NOTIFY (8000 bytes); otherwise only its id, and the agent reads it.
+    op.execute("""
+    CREATE OR REPLACE FUNCTION notify_communication_inserted()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        target_user_id INTEGER;
+        payload TEXT;
+    BEGIN
+        SELECT id INTO target_user_id FROM users WHERE session_id = NEW.session_id;
+
+        payload := json_build_object(
+            'id', NEW.id,
+            'session_id', NEW.session_id,
+            'user_id', target_user_id,
+            'message', NEW.message,
+            'created_at', NEW.created_at
+        )::text;
+
+        IF octet_length(payload) > 7900 THEN
+            payload := json_build_object(
+                'id', NEW.id,
+                'session_id', NEW.session_id,
+                'user_id', target_user_id
+            )::text;
+        END IF;
+
+        PERFORM pg_notify('communication_inserted', payload);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+    # 2. Create the trigger that uses the function
+    op.execute("""
+    CREATE TRIGGER trg_communication_notify_insert
+    AFTER INSERT ON communication
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_communication_inserted();
+    """)
+
+
+def downgrade() -> None:
+    # Drop the trigger and the function in reverse order
+    op.execute("DROP TRIGGER IF EXISTS trg_communication_notify_insert ON communication;")
+    op.execute("DROP FUNCTION IF EXISTS notify_communication_inserted();")
@@ -0,0 +1,42 @@
+"""Add communication archive index table
+
+Revision ID: a8c0e2f4b691
+Revises: f7a9b1c3d468
+Create Date: 2026-10-17 17:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c0e2f4b691'
+down_revision: Union[str, None] = 'f7a9b1c3d468'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'communication_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('segment', sa.String(), nullable=False),
+        sa.Column('offset', sa.BigInteger(), nullable=False),
+        sa.Column('length', sa.Integer(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('first_id', sa.Integer(), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_communication_archive_session_id_last_id', 'communication_archive', ['session_id', 'last_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_communication_archive_session_id_last_id', table_name='communication_archive')
+    op.drop_table('communication_archive')
@@ -0,0 +1,39 @@
+"""Add unique constraint on attributes (client_id, template_id)
+
+Revision ID: b9d1f3a5c7e2
+Revises: a8c0e2f4b691
+Create Date: 2026-10-17 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d1f3a5c7e2'
+down_revision: Union[str, None] = 'a8c0e2f4b691'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Remove duplicated pairs, keeping the newest row. The rules documents
+    #    already resolve duplicates that way (later ids win), so they stay valid.
+    op.execute("""
+    DELETE FROM attributes a
+    USING attributes b
+    WHERE a.client_id = b.client_id
+      AND a.template_id = b.template_id
+      AND a.id < b.id
+    """)
+
+    # 2. Create the constraint; its index also serves lookups by client_id
+    op.create_unique_constraint(
+        'uq_attributes_client_id_template_id', 'attributes', ['client_id', 'template_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_attributes_client_id_template_id', 'attributes', type_='unique')
@@ -0,0 +1,35 @@
+"""Add (session_id, id) index on communication
+
+Revision ID: c2d4e6f8a135
+Revises: a4f6c8e0b213
+Create Date: 2026-10-17 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d4e6f8a135'
+down_revision: Union[str, None] = 'a4f6c8e0b213'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids locking writes to the table while the index is built
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_communication_session_id_id', 'communication', ['session_id', 'id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_communication_session_id_id', table_name='communication',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,44 @@
+"""Add indexes for paginated user listings
+
+Revision ID: d5e7f9a1b246
+Revises: c2d4e6f8a135
+Create Date: 2026-10-17 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e7f9a1b246'
+down_revision: Union[str, None] = 'c2d4e6f8a135'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids locking writes to the table while the indexes are built
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_client_id_id', 'users', ['client_id', 'id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_users_username_pattern', 'users', ['username'],
+            postgresql_ops={'username': 'varchar_pattern_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_users_username_pattern', table_name='users',
+            postgresql_concurrently=True, if_exists=True,
+        )
+        op.drop_index(
+            'ix_users_client_id_id', table_name='users',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,119 @@
+"""Add daily communication statistics rollup
+
+Revision ID: e6f8a0b2c357
+Revises: d5e7f9a1b246
+Create Date: 2026-10-17 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f8a0b2c357'
+down_revision: Union[str, None] = 'd5e7f9a1b246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Create the rollup tables
+    op.create_table(
+        'communication_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('messages', sa.Integer(), nullable=False),
+        sa.Column('sessions', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('day', 'client_id'),
+    )
+    op.create_table(
+        'communication_session_days',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('day', 'session_id'),
+    )
+    op.create_index(
+        'ix_communication_session_days_client_id_day', 'communication_session_days', ['client_id', 'day']
+    )
+
+    # 2. Create the trigger function. It runs once per INSERT statement over the
+    #    transition table, so bulk inserts are rolled up with one upsert per
+    #    (day, client). A session is counted for a day only when its
+    #    (day, session_id) row is new.
+    op.execute("""
+    CREATE OR REPLACE FUNCTION rollup_communication_inserted()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        WITH inserted_rows AS (
+            SELECT i.created_at::date AS day, i.session_id, u.client_id
+            FROM inserted i
+            JOIN users u ON u.session_id = i.session_id
+        ),
+        new_session_days AS (
+            INSERT INTO communication_session_days (day, session_id, client_id)
+            SELECT DISTINCT day, session_id, client_id FROM inserted_rows
+            ORDER BY day, session_id
+            ON CONFLICT DO NOTHING
+            RETURNING day, client_id
+        ),
+        session_counts AS (
+            SELECT day, client_id, count(*) AS sessions FROM new_session_days GROUP BY day, client_id
+        ),
+        message_counts AS (
+            SELECT day, client_id, count(*) AS messages FROM inserted_rows GROUP BY day, client_id
+        )
+        INSERT INTO communication_daily_stats (day, client_id, messages, sessions)
+        SELECT m.day, m.client_id, m.messages, coalesce(s.sessions, 0)
+        FROM message_counts m
+        LEFT JOIN session_counts s USING (day, client_id)
+        ORDER BY m.day, m.client_id
+        ON CONFLICT (day, client_id) DO UPDATE
+        SET messages = communication_daily_stats.messages + EXCLUDED.messages,
+            sessions = communication_daily_stats.sessions + EXCLUDED.sessions;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+    # 3. Create the trigger that uses the function. Creating it locks out
+    #    inserts until this migration commits, so the backfill below misses nothing.
+    op.execute("""
+    CREATE TRIGGER trg_communication_rollup
+    AFTER INSERT ON communication
+    REFERENCING NEW TABLE AS inserted
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_communication_inserted();
+    """)
+
+    # 4. Backfill from the existing rows. Old records may have no created_at
+    #    (the set_created_at trigger only covers new inserts); without a day
+    #    they cannot be bucketed, so they are left out of the rollup.
+    op.execute("""
+    INSERT INTO communication_session_days (day, session_id, client_id)
+    SELECT DISTINCT c.created_at::date, c.session_id, u.client_id
+    FROM communication c
+    JOIN users u ON u.session_id = c.session_id
+    WHERE c.created_at IS NOT NULL;
+    """)
+    op.execute("""
+    INSERT INTO communication_daily_stats (day, client_id, messages, sessions)
+    SELECT c.created_at::date, u.client_id, count(*), count(DISTINCT c.session_id)
+    FROM communication c
+    JOIN users u ON u.session_id = c.session_id
+    WHERE c.created_at IS NOT NULL
+    GROUP BY c.created_at::date, u.client_id;
+    """)
+
+
+def downgrade() -> None:
+    # Drop the trigger, the function and the tables in reverse order
+    op.execute("DROP TRIGGER IF EXISTS trg_communication_rollup ON communication;")
+    op.execute("DROP FUNCTION IF EXISTS rollup_communication_inserted();")
+    op.drop_index('ix_communication_session_days_client_id_day', table_name='communication_session_days')
+    op.drop_table('communication_session_days')
+    op.drop_table('communication_daily_stats')
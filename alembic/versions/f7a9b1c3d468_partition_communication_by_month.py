@@ -0,0 +1,192 @@
+"""Partition communication by created_at month
+
+Revision ID: f7a9b1c3d468
+Revises: e6f8a0b2c357
+Create Date: 2026-10-17 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a9b1c3d468'
+down_revision: Union[str, None] = 'e6f8a0b2c357'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions created ahead of time; `python -m shared.partitions` keeps this window open
+MONTHS_AHEAD = 3
+
+# Rows are routed to a partition before BEFORE ROW triggers run, so an INSERT
+# with an explicit NULL created_at now fails ("no partition of relation found")
+# instead of being filled in here. Writers must omit the column (DEFAULT now()
+# covers it) or send a value. The same TRIGGERS are reused by the downgrade,
+# where the plain table fills explicit NULLs again.
+TRIGGERS = """
+CREATE TRIGGER trg_communication_set_created_at
+BEFORE INSERT ON communication
+FOR EACH ROW
+EXECUTE FUNCTION set_created_at_on_communication();
+
+CREATE TRIGGER trg_communication_notify_insert
+AFTER INSERT ON communication
+FOR EACH ROW
+EXECUTE FUNCTION notify_communication_inserted();
+
+CREATE TRIGGER trg_communication_rollup
+AFTER INSERT ON communication
+REFERENCING NEW TABLE AS inserted
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_communication_inserted();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS trg_communication_set_created_at ON {table};
+DROP TRIGGER IF EXISTS trg_communication_notify_insert ON {table};
+DROP TRIGGER IF EXISTS trg_communication_rollup ON {table};
+"""
+
+
+def upgrade() -> None:
+    # Requires PostgreSQL 13+ (BEFORE ROW triggers on partitioned tables).
+    #
+    # The existing rows are not copied: the old table is attached as the first
+    # partition, covering everything up to the next month boundary, and new
+    # months get their own partitions. Old data leaves that partition only when
+    # it is detached as a whole by the retention command.
+
+    # 1. Move the existing table aside, freeing the names the new table uses
+    op.execute("""
+    ALTER TABLE communication RENAME TO communication_legacy;
+    ALTER INDEX IF EXISTS communication_pkey RENAME TO communication_legacy_pkey;
+    ALTER INDEX IF EXISTS ix_communication_id RENAME TO ix_communication_legacy_id;
+    ALTER INDEX IF EXISTS ix_communication_session_id_id RENAME TO ix_communication_legacy_session_id_id;
+    """)
+
+    # 2. Date the old records that have no created_at, which the partition key
+    #    requires. Ids follow insertion order, so each one takes the earliest
+    #    timestamp among the rows after it (now() if none has one). They were
+    #    left out of the statistics rollup, so they are counted there now.
+    op.execute("""
+    WITH dated AS (
+        SELECT id, min(created_at) OVER (ORDER BY id DESC) AS fallback
+        FROM communication_legacy
+    ),
+    fixed AS (
+        UPDATE communication_legacy c
+        SET created_at = coalesce(d.fallback, now())
+        FROM dated d
+        WHERE d.id = c.id AND c.created_at IS NULL
+        RETURNING c.created_at::date AS day, c.session_id
+    ),
+    fixed_rows AS (
+        SELECT f.day, f.session_id, u.client_id
+        FROM fixed f
+        JOIN users u ON u.session_id = f.session_id
+    ),
+    new_session_days AS (
+        INSERT INTO communication_session_days (day, session_id, client_id)
+        SELECT DISTINCT day, session_id, client_id FROM fixed_rows
+        ON CONFLICT DO NOTHING
+        RETURNING day, client_id
+    ),
+    session_counts AS (
+        SELECT day, client_id, count(*) AS sessions FROM new_session_days GROUP BY day, client_id
+    ),
+    message_counts AS (
+        SELECT day, client_id, count(*) AS messages FROM fixed_rows GROUP BY day, client_id
+    )
+    INSERT INTO communication_daily_stats (day, client_id, messages, sessions)
+    SELECT m.day, m.client_id, m.messages, coalesce(s.sessions, 0)
+    FROM message_counts m
+    LEFT JOIN session_counts s USING (day, client_id)
+    ON CONFLICT (day, client_id) DO UPDATE
+    SET messages = communication_daily_stats.messages + EXCLUDED.messages,
+        sessions = communication_daily_stats.sessions + EXCLUDED.sessions;
+
+    ALTER TABLE communication_legacy ALTER COLUMN created_at SET NOT NULL;
+    """)
+    op.execute(DROP_TRIGGERS.format(table="communication_legacy"))
+
+    # 3. Create the partitioned table. The partition key must be part of the primary key.
+    op.execute("""
+    CREATE TABLE communication (
+        id INTEGER NOT NULL DEFAULT nextval('communication_id_seq'::regclass),
+        session_id VARCHAR NOT NULL,
+        message JSONB NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+        CONSTRAINT communication_pkey PRIMARY KEY (id, created_at),
+        CONSTRAINT communication_session_id_fkey FOREIGN KEY (session_id)
+            REFERENCES users (session_id) ON DELETE RESTRICT
+    ) PARTITION BY RANGE (created_at);
+
+    ALTER SEQUENCE communication_id_seq OWNED BY communication.id;
+    CREATE INDEX ix_communication_id ON communication (id);
+    CREATE INDEX ix_communication_session_id_id ON communication (session_id, id);
+    """)
+
+    # 4. Attach the old table and create the monthly partitions after it. The
+    #    CHECK constraint lets ATTACH skip its own validation scan. The old
+    #    rows are not split by month: shared.partitions only detaches this
+    #    partition once its newest row is past retention (see the README).
+    op.execute(f"""
+    DO $$
+    DECLARE
+        boundary TIMESTAMP;
+        month_start TIMESTAMP;
+    BEGIN
+        SELECT greatest(date_trunc('month', now()), coalesce(date_trunc('month', max(created_at)), '-infinity'))
+               + interval '1 month'
+        INTO boundary
+        FROM communication_legacy;
+
+        EXECUTE format('ALTER TABLE communication_legacy ADD CONSTRAINT communication_legacy_range CHECK (created_at < %L)', boundary);
+        EXECUTE format('ALTER TABLE communication ATTACH PARTITION communication_legacy FOR VALUES FROM (MINVALUE) TO (%L)', boundary);
+        ALTER TABLE communication_legacy DROP CONSTRAINT communication_legacy_range;
+
+        FOR i IN 0..{MONTHS_AHEAD - 1} LOOP
+            month_start := boundary + make_interval(months => i);
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF communication FOR VALUES FROM (%L) TO (%L)',
+                'communication_' || to_char(month_start, '"y"YYYY"m"MM'),
+                month_start,
+                month_start + interval '1 month'
+            );
+        END LOOP;
+    END;
+    $$;
+    """)
+
+    # 5. Recreate the triggers on the parent; PostgreSQL clones the row-level
+    #    ones onto every partition, present and future
+    op.execute(TRIGGERS)
+
+
+def downgrade() -> None:
+    # Folds the attached partitions back into a plain table. Rows in partitions
+    # that were already detached are not brought back.
+    op.execute("""
+    CREATE TABLE communication_plain (
+        id INTEGER NOT NULL DEFAULT nextval('communication_id_seq'::regclass),
+        session_id VARCHAR NOT NULL,
+        message JSONB NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+    );
+    INSERT INTO communication_plain (id, session_id, message, created_at)
+    SELECT id, session_id, message, created_at FROM communication;
+
+    ALTER SEQUENCE communication_id_seq OWNED BY NONE;
+    DROP TABLE communication;
+
+    ALTER TABLE communication_plain RENAME TO communication;
+    ALTER TABLE communication ADD CONSTRAINT communication_pkey PRIMARY KEY (id);
+    ALTER TABLE communication ADD CONSTRAINT communication_session_id_fkey FOREIGN KEY (session_id)
+        REFERENCES users (session_id) ON DELETE RESTRICT;
+    ALTER SEQUENCE communication_id_seq OWNED BY communication.id;
+    CREATE INDEX ix_communication_id ON communication (id);
+    CREATE INDEX ix_communication_session_id_id ON communication (session_id, id);
+    """)
+    op.execute(TRIGGERS)
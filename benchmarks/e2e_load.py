@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark: question -> webhook -> answer -> WebSocket.
+
+Opens one WebSocket per simulated user, sends questions to QUESTION_ENDPOINT
+at a target rate and measures the time until the matching answer arrives on
+the socket. Needs the core and agent services plus the n8n stand-in:
+
+    python benchmarks/n8n_standin.py --port 5678 &
+    python benchmarks/e2e_load.py --client-code DEMO --users 50 --rate 20 --duration 60
+
+Results are printed and saved as JSON (benchmarks/results/ by default) so
+releases can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+import websockets
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUESTION_ENDPOINT = os.getenv("QUESTION_ENDPOINT", "/question")
+CORE_URL = f"http://localhost:{os.getenv('CORE_PORT', '8000')}"
+AGENT_URL = f"http://localhost:{os.getenv('AGENT_PORT', '8001')}"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def open_sessions(args, http: httpx.AsyncClient):
+    users = []
+    for i in range(args.users):
+        username = f"{args.user_prefix}-{i}"
+        response = await http.get(
+            f"{args.core_url}/api/users/session", params={"client_code": args.client_code, "username": username}
+        )
+        response.raise_for_status()
+        users.append((username, response.json()["user_id"]))
+    return users
+
+
+async def listen(ws_url: str, pending: dict, latencies: list, ready: asyncio.Event):
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        ready.set()
+        async for raw in ws:
+            if raw == "new_message":
+                continue
+            try:
+                content = json.loads(raw)["message"]["content"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            # Coalesced answers may carry several tokens
+            for token in [word for word in str(content).split() if word.startswith("bench-")]:
+                sent_at = pending.pop(token, None)
+                if sent_at is not None:
+                    latencies.append(time.perf_counter() - sent_at)
+
+
+async def main(args):
+    agent_ws = args.agent_url.replace("http://", "ws://").replace("https://", "wss://")
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as http:
+        users = await open_sessions(args, http)
+
+        pending, latencies, errors = {}, [], 0
+        listeners = []
+        for _, user_id in users:
+            ready = asyncio.Event()
+            listeners.append(asyncio.create_task(listen(f"{agent_ws}/ws/{user_id}", pending, latencies, ready)))
+            await ready.wait()
+
+        async def ask(username: str):
+            nonlocal errors
+            token = f"bench-{uuid.uuid4().hex}"
+            pending[token] = time.perf_counter()
+            try:
+                response = await http.get(
+                    f"{args.agent_url}{QUESTION_ENDPOINT}",
+                    params={"username": username, "client_code": args.client_code, "texto": token},
+                )
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                pending.pop(token, None)
+
+        requests, tasks = 0, []
+        interval = 1 / args.rate
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.duration:
+            username = users[requests % len(users)][0]
+            tasks.append(asyncio.create_task(ask(username)))
+            requests += 1
+            next_at = start + requests * interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        send_elapsed = time.perf_counter() - start
+
+        # Give in-flight answers time to arrive
+        deadline = time.perf_counter() + args.drain_timeout
+        while pending and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+        for task in listeners:
+            task.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    latencies.sort()
+    result = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "config": {
+            "users": args.users,
+            "target_rate": args.rate,
+            "duration": args.duration,
+            "client_code": args.client_code,
+        },
+        "requests": requests,
+        "answered": len(latencies),
+        "errors": errors,
+        "lost": len(pending),
+        "offered_rate": round(requests / send_elapsed, 2),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": round(latencies[-1] * 1000, 2) if latencies else None,
+            "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        },
+    }
+    print(json.dumps(result, indent=2))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--client-code", required=True)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--user-prefix", default="bench")
+    parser.add_argument("--rate", type=float, default=10.0, help="questions per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--core-url", default=CORE_URL)
+    parser.add_argument("--agent-url", default=AGENT_URL)
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
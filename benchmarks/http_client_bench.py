@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compares a fresh httpx.AsyncClient per call (the old behaviour of the agent
+service) against the shared, pooled client from shared.http_clients.
+
+A local stand-in for the n8n webhook is started with uvicorn so no external
+service is needed:
+
+    python benchmarks/http_client_bench.py --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.http_clients import HttpClients
+
+webhook_app = FastAPI()
+
+
+@webhook_app.post("/webhook")
+async def webhook(payload: dict):
+    return {"ok": True}
+
+
+def start_standin(port: int) -> uvicorn.Server:
+    config = uvicorn.Config(webhook_app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def summarize(name: str, latencies: list, elapsed: float):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(
+        f"{name:<14} n={len(latencies):<6} rps={len(latencies) / elapsed:8.1f} "
+        f"p50={p(0.50):6.2f}ms p95={p(0.95):6.2f}ms p99={p(0.99):6.2f}ms "
+        f"mean={statistics.mean(latencies) * 1000:6.2f}ms"
+    )
+
+
+async def run(url: str, total: int, concurrency: int, post):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = {"session_id": "bench", "prompt": "hola"}
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await post(url, payload)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, time.perf_counter() - start
+
+
+async def main(args):
+    server = start_standin(args.port)
+    url = f"http://127.0.0.1:{args.port}/webhook"
+
+    async def fresh_client_post(url, payload):
+        async with httpx.AsyncClient() as client:
+            await client.post(url, json=payload)
+
+    clients = HttpClients()
+    await clients.start()
+
+    async def pooled_post(url, payload):
+        await clients.webhook.post(url, json=payload, timeout=clients.webhook_timeout)
+
+    try:
+        # Warm up both paths so import/JIT-ish costs do not skew the first rows
+        await run(url, 50, args.concurrency, fresh_client_post)
+        await run(url, 50, args.concurrency, pooled_post)
+
+        summarize("fresh client", *await run(url, args.requests, args.concurrency, fresh_client_post))
+        summarize("pooled client", *await run(url, args.requests, args.concurrency, pooled_post))
+    finally:
+        await clients.close()
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
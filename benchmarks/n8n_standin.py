@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Bitworks.json n8n workflow.
+
+For every webhook call it does what the workflow does, minus the LLM:
+  1. calls the client, rules and products tool endpoints of the agent
+  2. waits --llm-delay-ms to simulate the model
+  3. inserts the human and ai rows into `communication`, in the format of
+     the n8n Postgres chat memory node
+  4. calls the answer endpoint
+
+Start it and point the URL_AGENT setting at it:
+
+    python benchmarks/n8n_standin.py --port 5678 --llm-delay-ms 300
+    # URL_AGENT = http://localhost:5678/webhook/message
+"""
+import argparse
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.database import AsyncSessionLocal
+from shared.models import Communication
+
+LLM_DELAY = 0.0
+http_client: httpx.AsyncClient = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    http_client = httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=200))
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+
+
+app = FastAPI(title="n8n stand-in", lifespan=lifespan)
+
+
+async def run_workflow(body: dict):
+    session = {"session_id": body["session_id"]}
+    try:
+        await asyncio.gather(
+            http_client.get(body["client_ep"], params=session),
+            http_client.get(body["rule_ep"], params=session),
+            http_client.get(body["product_ep"], params=session),
+        )
+        await asyncio.sleep(LLM_DELAY)
+
+        async with AsyncSessionLocal() as db:
+            db.add(Communication(session_id=body["session_id"], message={
+                "type": "human", "content": body["prompt"], "additional_kwargs": {}, "response_metadata": {},
+            }))
+            db.add(Communication(session_id=body["session_id"], message={
+                "type": "ai", "content": f"echo: {body['prompt']}", "tool_calls": [],
+                "additional_kwargs": {}, "response_metadata": {}, "invalid_tool_calls": [],
+            }))
+            await db.commit()
+
+        await http_client.get(body["answer_ep"], params=session)
+    except Exception as e:
+        print(f"Stand-in workflow failed for session {body.get('session_id')}: {e!r}")
+
+
+@app.post("/webhook/message")
+async def message(request: Request):
+    body = await request.json()
+    # n8n answers the webhook immediately and runs the workflow afterwards
+    asyncio.create_task(run_workflow(body))
+    return {"message": "Workflow was started"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5678)
+    parser.add_argument("--llm-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    LLM_DELAY = args.llm_delay_ms / 1000
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Load test for the agent QUESTION endpoint.
+
+Fires concurrent /question requests at a running agent service and reports
+throughput and latency percentiles. Run it once against a build using the
+synchronous Session and once against the AsyncSession build to compare:
+
+    python benchmarks/question_load.py --base-url http://localhost:8001 \\
+        --client-code DEMO --users 200 --requests 5000 --concurrency 100
+
+Point URL_AGENT at a stand-in webhook (e.g. the one in
+benchmarks/http_client_bench.py) so n8n is not part of the measurement.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUESTION_ENDPOINT = os.getenv("QUESTION_ENDPOINT", "/question")
+
+
+def percentile(values: list, q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main(args):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        async def one(i: int):
+            nonlocal errors
+            params = {
+                "username": f"load-user-{i % args.users}",
+                "client_code": args.client_code,
+                "texto": "hola",
+            }
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(QUESTION_ENDPOINT, params=params)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        # Warm up: creates the users so the measured run only reads
+        await asyncio.gather(*(one(i) for i in range(args.users)))
+        latencies.clear()
+        errors = 0
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=f"http://localhost:{os.getenv('AGENT_PORT', '8001')}")
+    parser.add_argument("--client-code", required=True)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
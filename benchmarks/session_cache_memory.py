@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Measures the memory cost per entry of shared.session_cache.SessionCache.
+
+    python benchmarks/session_cache_memory.py --sessions 1000000
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.session_cache import SessionCache, SessionRecord
+
+
+def main(args):
+    session_ids = [str(uuid.uuid4()) for _ in range(args.sessions)]
+    ids_size = sum(sys.getsizeof(session_id) for session_id in session_ids)
+
+    cache = SessionCache(maxsize=args.sessions)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for i, session_id in enumerate(session_ids):
+        cache.sessions[session_id] = SessionRecord(i, i % 1000, "Activo")
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    structure = after - before
+    per_entry = (structure + ids_size) / args.sessions
+    print(f"sessions:            {args.sessions}")
+    print(f"SessionRecord:       {sys.getsizeof(SessionRecord(1, 1, 'Activo'))} bytes")
+    print(f"session id string:   {ids_size / args.sessions:.0f} bytes")
+    print(f"records + LRU slots: {structure / args.sessions:.0f} bytes")
+    print(f"total per entry:     {per_entry:.0f} bytes")
+    print(f"total:               {(structure + ids_size) / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    main(parser.parse_args())
@@ -37,6 +37,8 @@ import TrashIcon from '@heroicons/react/24/solid/TrashIcon';
 import EllipsisVerticalIcon from '@heroicons/react/24/solid/EllipsisVerticalIcon';
 import { useRouter } from 'next/navigation';
 import MuiAlert, { AlertProps } from '@mui/material/Alert';
+import { fetchAllPages } from '@/lib/fetch-all-pages';
+import { useCursorPagination } from '@/hooks/use-cursor-pagination';
 
 interface AttributeDetail extends Attribute {
   client_name: string;
@@ -45,7 +47,16 @@ interface AttributeDetail extends Attribute {
 }
 
 export default function AttributesPage() {
-  const [attributes, setAttributes] = useState<AttributeDetail[]>([]);
+  const {
+    rows: attributes,
+    setRows: setAttributes,
+    total,
+    page,
+    rowsPerPage,
+    reload: reloadAttributes,
+    handleChangePage,
+    handleChangeRowsPerPage,
+  } = useCursorPagination<AttributeDetail>('/api/attributes');
   const [clients, setClients] = useState<Client[]>([]);
   const [templates, setTemplates] = useState<Template[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
@@ -70,8 +81,6 @@ export default function AttributesPage() {
   const [isDeleteModalOpen, setDeleteModalOpen] = useState(false);
   const [attributeToDelete, setAttributeToDelete] = useState<AttributeDetail | null>(null);
 
-  const [page, setPage] = useState(0);
-  const [rowsPerPage, setRowsPerPage] = useState(10);
   const [snackbarOpen, setSnackbarOpen] = useState(false);
   const [snackbarMessage, setSnackbarMessage] = useState('');
   const [snackbarSeverity, setSnackbarSeverity] = useState<'success' | 'error' | 'info' | 'warning'>('success');
@@ -81,24 +90,14 @@ export default function AttributesPage() {
     const loadData = async () => {
       try {
         setLoading(true);
-        const [attributesRes, clientsRes, templatesRes] = await Promise.all([
-          fetch('/api/attributes').catch(() => {
-            console.warn('/api/attributes endpoint does not exist yet.');
-            return { ok: true, json: () => Promise.resolve([]) };
-          }),
-          fetch('/api/clients'),
-          fetch('/api/templates'),
-        ]);
-
-        if (!attributesRes.ok || !clientsRes.ok || !templatesRes.ok) {
+        const [, clientsData, templatesData] = await Promise.all([
+          reloadAttributes(),
+          fetchAllPages<Client>('/api/clients'),
+          fetchAllPages<Template>('/api/templates'),
+        ]).catch(() => {
           throw new Error('Failed to fetch initial data.');
-        }
-
-        const attributesData = await attributesRes.json();
-        const clientsData = await clientsRes.json();
-        const templatesData = await templatesRes.json();
+        });
 
-        setAttributes(attributesData);
         setClients(clientsData);
         setTemplates(templatesData);
       } catch (err) {
@@ -138,15 +137,6 @@ export default function AttributesPage() {
     setActiveAttributeForMenu(null);
   };
 
-  const handleChangePage = (event: unknown, newPage: number) => {
-    setPage(newPage);
-  };
-
-  const handleChangeRowsPerPage = (event: React.ChangeEvent<HTMLInputElement>) => {
-    setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
-  };
-
   const Alert = React.forwardRef<HTMLDivElement, AlertProps>(function Alert(props, ref) {
     return <MuiAlert elevation={6} ref={ref} variant="filled" {...props} />;
   });
@@ -212,8 +202,7 @@ export default function AttributesPage() {
         throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
       }
 
-      const createdAttribute: AttributeDetail = await response.json();
-      setAttributes(prev => [...prev, createdAttribute]);
+      reloadAttributes().catch(err => console.error('Error reloading attributes:', err));
       showNotification('Attribute created successfully!', 'success');
       setCreateModalOpen(false);
     } catch (err) {
@@ -267,7 +256,7 @@ export default function AttributesPage() {
         throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
       }
 
-      setAttributes(prev => prev.filter(attr => attr.id !== attributeToDelete.id));
+      reloadAttributes().catch(err => console.error('Error reloading attributes:', err));
       showNotification('Attribute deleted successfully!', 'success');
       setDeleteModalOpen(false);
       setAttributeToDelete(null);
@@ -319,9 +308,7 @@ export default function AttributesPage() {
                   </TableRow>
                 </TableHead>
                 <TableBody>
-                  {attributes
-                    .slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage)
-                    .map(attr => (
+                  {attributes.map(attr => (
                       <TableRow hover key={attr.id} sx={{ '&:nth-of-type(odd)': { backgroundColor: 'background.paper' }, '&:nth-of-type(even)': { backgroundColor: 'action.hover' } }}>
                         <TableCell>{attr.client_name}</TableCell>
                         <TableCell>{attr.template_description}</TableCell>
@@ -338,7 +325,7 @@ export default function AttributesPage() {
               </Table>
             )}
           </Box>
-          <TablePagination component="div" count={attributes.length} onPageChange={handleChangePage} onRowsPerPageChange={handleChangeRowsPerPage} page={page} rowsPerPage={rowsPerPage} rowsPerPageOptions={[10, 25]} />
+          <TablePagination component="div" count={total} onPageChange={handleChangePage} onRowsPerPageChange={handleChangeRowsPerPage} page={page} rowsPerPage={rowsPerPage} rowsPerPageOptions={[10, 25]} />
         </Card>
       </Stack>
 
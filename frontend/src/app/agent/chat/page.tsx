@@ -24,6 +24,7 @@ import {
 import { alpha, useTheme } from '@mui/material/styles';
 import { CaretDown as CaretDownIcon } from '@phosphor-icons/react/dist/ssr/CaretDown';
 import { PaperPlaneTilt as PaperPlaneTiltIcon } from '@phosphor-icons/react/dist/ssr/PaperPlaneTilt';
+import { fetchAllPages } from '@/lib/fetch-all-pages';
 
 // Interfaces
 interface Client {
@@ -79,6 +80,9 @@ export default function ChatPage() {
   const [communications, setCommunications] = useState<Communication[]>([]);
   const [messageText, setMessageText] = useState('');
   const [isTyping, setIsTyping] = useState(false);
+  // Older history is fetched on demand, one page at a time
+  const [nextBeforeId, setNextBeforeId] = useState<number | null>(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
 
   const [clients, setClients] = useState<Client[]>([]);
   const [usersForClient, setUsersForClient] = useState<User[]>([]);
@@ -92,22 +96,26 @@ export default function ChatPage() {
   const isUserMenuOpen = Boolean(userMenuAnchorEl);
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // Highest message id received from the server; WebSocket reconnects resume after it
+  const lastSeenIdRef = useRef<number>(0);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  // Only new messages at the end scroll the view; older pages prepended on top do not
+  const lastCommunicationId = communications.length > 0 ? communications[communications.length - 1].id : null;
   useEffect(() => {
     scrollToBottom();
-  }, [communications, isTyping]);
+  }, [lastCommunicationId, isTyping]);
 
   useEffect(() => {
     const fetchClients = async () => {
       try {
-        const response = await fetch('/api/clients');
-        if (!response.ok) throw new Error('Error al cargar la lista de clientes');
-        const data: Client[] = await response.json();
-        setClients(data.filter((c) => c.status === 'Activo'));
+        const data = await fetchAllPages<Client>('/api/clients?status=Activo').catch(() => {
+          throw new Error('Error al cargar la lista de clientes');
+        });
+        setClients(data);
       } catch (err) {
         setError(err instanceof Error ? err.message : 'Un error inesperado ocurrió');
       } finally {
@@ -121,9 +129,9 @@ export default function ChatPage() {
     if (selectedClient) {
       const fetchUsers = async () => {
         try {
-          const response = await fetch(`/api/clients/${selectedClient.client_code}/users`);
-          if (!response.ok) throw new Error('Error al cargar los usuarios del cliente');
-          const data: User[] = await response.json();
+          const data = await fetchAllPages<User>(`/api/clients/${selectedClient.client_code}/users`).catch(() => {
+            throw new Error('Error al cargar los usuarios del cliente');
+          });
           setUsersForClient(data);
         } catch (err) {
           setError(err instanceof Error ? err.message : 'Un error inesperado ocurrió');
@@ -138,32 +146,64 @@ export default function ChatPage() {
 
   useEffect(() => {
     if (!userSession) return;
-    const wsUrl = `ws://localhost:${AGENT_PORT}/ws/${userSession.user_id}`;
-    const ws = new WebSocket(wsUrl);
-    ws.onopen = () => console.log('WebSocket connection established');
-    ws.onmessage = (event) => {
-      try {
-        // Attempt to parse the data as a full message object.
-        const newCommunication = JSON.parse(event.data);
+    let ws: WebSocket | null = null;
+    let stopped = false;
+    let retryDelay = 1000;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
 
-        // If parsing succeeds, it's a real message from the AI.
-        // Now we can stop the typing indicator and add the message.
-        setIsTyping(false);
-        setCommunications((prev) => [...prev, newCommunication]);
-
-      } catch (e) {
-        // If parsing fails, it's likely a control message like "new_message".
-        // In this case, we do nothing and keep the typing indicator active.
-        if (event.data === 'new_message') {
-          console.log('Agent has received the message and is processing...');
-        } else {
-          console.warn('Received non-JSON WebSocket message:', event.data);
+    const connect = () => {
+      // The agent replays the rows after last_seen_id before resuming live delivery
+      ws = new WebSocket(`ws://localhost:${AGENT_PORT}/ws/${userSession.user_id}?last_seen_id=${lastSeenIdRef.current}`);
+      ws.onopen = () => {
+        retryDelay = 1000;
+        console.log('WebSocket connection established');
+      };
+      ws.onmessage = (event) => {
+        let data;
+        try {
+          data = JSON.parse(event.data);
+        } catch (e) {
+          // If parsing fails, it's likely a control message like "new_message".
+          // In this case, we do nothing and keep the typing indicator active.
+          if (event.data === 'new_message') {
+            console.log('Agent has received the message and is processing...');
+          } else {
+            console.warn('Received non-JSON WebSocket message:', event.data);
+          }
+          return;
         }
-      }
+
+        if (data.type === 'replay_truncated') {
+          // More messages were missed than one replay carries: reconnect from where this one stopped
+          lastSeenIdRef.current = data.next_id;
+          retryDelay = 0;
+          ws?.close();
+          return;
+        }
+        if (typeof data.id === 'number') {
+          if (data.id <= lastSeenIdRef.current) return;
+          lastSeenIdRef.current = data.id;
+        }
+
+        // A real message from the AI: stop the typing indicator and add it.
+        setIsTyping(false);
+        setCommunications((prev) => [...prev, data]);
+      };
+      ws.onclose = () => {
+        console.log('WebSocket connection closed');
+        if (stopped) return;
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(Math.max(retryDelay * 2, 1000), 30000);
+      };
+      ws.onerror = (error) => console.error('WebSocket error:', error);
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      ws?.close();
     };
-    ws.onclose = () => console.log('WebSocket connection closed');
-    ws.onerror = (error) => console.error('WebSocket error:', error);
-    return () => ws.close();
   }, [userSession]);
 
   const initializeUser = async () => {
@@ -179,6 +219,8 @@ export default function ChatPage() {
         throw new Error(errorData.detail);
       }
       const data = await response.json();
+      const history: Communication[] = data.communications || [];
+      lastSeenIdRef.current = history.reduce((max, comm) => (typeof comm.id === 'number' ? Math.max(max, comm.id) : max), 0);
       setUserSession({
         user_id: data.user_id,
         username: data.username,
@@ -187,12 +229,30 @@ export default function ChatPage() {
         client_code: data.client_code,
         client_name: data.client_name,
       });
-      setCommunications(data.communications || []);
+      setCommunications(history);
+      setNextBeforeId(data.next_before_id ?? null);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Un error inesperado ocurrió');
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!userSession || nextBeforeId === null) return;
+    setLoadingOlder(true);
+    try {
+      const response = await fetch(`/api/communications/${userSession.session_id}?before_id=${nextBeforeId}`);
+      if (!response.ok) throw new Error('Error al cargar los mensajes anteriores');
+      const older: Communication[] = await response.json();
+      const next = response.headers.get('X-Next-Before-Id');
+      setCommunications((prev) => [...older, ...prev]);
+      setNextBeforeId(next ? Number(next) : null);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Un error inesperado ocurrió');
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const sendMessage = async () => {
     if (!messageText.trim() || !userSession) return;
     const tempComm: Communication = {
@@ -223,6 +283,8 @@ export default function ChatPage() {
   const changeUser = () => {
     setUserSession(null);
     setCommunications([]);
+    setNextBeforeId(null);
+    lastSeenIdRef.current = 0;
     setSelectedClient(null);
     setSelectedUsername('');
     setIsNewUser(false);
@@ -359,6 +421,13 @@ export default function ChatPage() {
         <Box sx={{ flexGrow: 1, display: 'flex', flexDirection: 'column', overflow: 'hidden' }}>
           <Paper sx={{ borderRadius: 0, flexGrow: 1, overflow: 'auto', p: 2, bgcolor: theme.palette.grey[50] }}>
             <Stack spacing={2}>
+              {nextBeforeId !== null && (
+                <Box sx={{ display: 'flex', justifyContent: 'center' }}>
+                  <Button size="small" onClick={loadOlderMessages} disabled={loadingOlder}>
+                    Cargar mensajes anteriores
+                  </Button>
+                </Box>
+              )}
               {communications.map((comm) => {
                 const parsedMsg = parseMessage(comm.message);
                 const isHuman = parsedMsg.type === 'human' || parsedMsg.type === 'user';
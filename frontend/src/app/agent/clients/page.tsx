@@ -40,8 +40,19 @@ import EllipsisVerticalIcon from '@heroicons/react/24/solid/EllipsisVerticalIcon
 import { useRouter } from 'next/navigation';
 
 import MuiAlert, { AlertProps } from '@mui/material/Alert';
+import { fetchAllPages } from '@/lib/fetch-all-pages';
+import { useCursorPagination } from '@/hooks/use-cursor-pagination';
 export default function ClientsPage() {
-  const [clients, setClients] = useState<Client[]>([]);
+  const {
+    rows: clients,
+    setRows: setClients,
+    total,
+    page,
+    rowsPerPage,
+    reload: reloadClients,
+    handleChangePage,
+    handleChangeRowsPerPage,
+  } = useCursorPagination<Client>('/api/clients');
   const [templates, setTemplates] = useState<Template[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
@@ -63,8 +74,6 @@ export default function ClientsPage() {
   const [activeClientForMenu, setActiveClientForMenu] = useState<Client | null>(null);
   const [isDeleteModalOpen, setDeleteModalOpen] = useState(false);
   const [clientToDelete, setClientToDelete] = useState<Client | null>(null);
-  const [page, setPage] = useState(0);
-  const [rowsPerPage, setRowsPerPage] = useState(10);
   const [snackbarOpen, setSnackbarOpen] = useState(false);
   const [snackbarMessage, setSnackbarMessage] = useState('');
   const [snackbarSeverity, setSnackbarSeverity] = useState<'success' | 'error' | 'info' | 'warning'>('success');
@@ -73,12 +82,7 @@ export default function ClientsPage() {
 
   const fetchClients = async () => {
     try {
-      const response = await fetch('/api/clients');
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data: Client[] = await response.json();
-      setClients(data);
+      await reloadClients();
     } catch (err) {
       throw new Error('Failed to fetch clients.');
     }
@@ -86,11 +90,7 @@ export default function ClientsPage() {
 
   const fetchTemplates = async () => {
     try {
-      const response = await fetch('/api/templates');
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data: Template[] = await response.json();
+      const data = await fetchAllPages<Template>('/api/templates');
       setTemplates(data);
     } catch (err) {
       throw new Error('Failed to fetch templates.');
@@ -164,15 +164,6 @@ export default function ClientsPage() {
     setActiveClientForMenu(null);
   };
 
-  const handleChangePage = (event: unknown, newPage: number) => {
-    setPage(newPage);
-  };
-
-  const handleChangeRowsPerPage = (event: React.ChangeEvent<HTMLInputElement>) => {
-    setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
-  };
-
   const Alert = React.forwardRef<HTMLDivElement, AlertProps>(function Alert(props, ref) {
     return <MuiAlert elevation={6} ref={ref} variant="filled" {...props} />;
   });
@@ -285,8 +276,7 @@ export default function ClientsPage() {
         throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
       }
 
-      const createdClient: Client = await response.json();
-      setClients(prevClients => [...prevClients, createdClient]);
+      reloadClients().catch(err => console.error('Error reloading clients:', err));
       showNotification('Client created successfully!', 'success');
       setCreateModalOpen(false);
     } catch (err) {
@@ -317,7 +307,7 @@ export default function ClientsPage() {
         const errorData = await response.json().catch(() => ({ message: 'Failed to delete client.' }));
         throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
       }
-      setClients(prevClients => prevClients.filter(c => c.id !== clientToDelete.id));
+      reloadClients().catch(err => console.error('Error reloading clients:', err));
       showNotification('Client deleted successfully!', 'success');
     } catch (err) {
       if (err instanceof Error) {
@@ -381,9 +371,7 @@ export default function ClientsPage() {
                   </TableRow>
                 </TableHead>
                 <TableBody>
-                  {clients
-                    .slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage)
-                    .map(client => (
+                  {clients.map(client => (
                     <TableRow
                       hover
                       key={client.id}
@@ -421,7 +409,7 @@ export default function ClientsPage() {
           </Box>
           <TablePagination
             component="div"
-            count={clients.length}
+            count={total}
             onPageChange={handleChangePage}
             onRowsPerPageChange={handleChangeRowsPerPage}
             page={page}
@@ -6,6 +6,7 @@ import { Box, Grid, Card, CardHeader, Divider, Stack } from '@mui/material';
 
 import { Sales } from '@/components/agent/overview/sales';
 import { TotalCustomers } from '@/components/agent/overview/total-customers';
+import { fetchTotalCount } from '@/lib/fetch-all-pages';
 
 export default function Page(): React.JSX.Element {
   const [totalClients, setTotalClients] = useState(0);
@@ -15,11 +16,7 @@ export default function Page(): React.JSX.Element {
   useEffect(() => {
     const fetchClients = async () => {
       try {
-        const response = await fetch('/api/clients');
-        if (response.ok) {
-          const data = await response.json();
-          setTotalClients(data.length);
-        }
+        setTotalClients(await fetchTotalCount('/api/clients'));
       } catch (error) {
         console.error('Failed to fetch clients:', error);
       }
@@ -27,11 +24,7 @@ export default function Page(): React.JSX.Element {
 
     const fetchUsers = async () => {
       try {
-        const response = await fetch('/api/users');
-        if (response.ok) {
-          const data = await response.json();
-          setTotalUsers(data.length);
-        }
+        setTotalUsers(await fetchTotalCount('/api/users'));
       } catch (error) {
         console.error('Failed to fetch users:', error);
       }
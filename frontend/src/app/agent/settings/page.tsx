@@ -37,9 +37,19 @@ import EllipsisVerticalIcon from '@heroicons/react/24/solid/EllipsisVerticalIcon
 import { useRouter } from 'next/navigation';
 import { ArrowRightIcon } from '@phosphor-icons/react/dist/ssr/ArrowRight';
 import MuiAlert, { AlertProps } from '@mui/material/Alert';
+import { useCursorPagination } from '@/hooks/use-cursor-pagination';
 
 export default function SettingsPage() {
-  const [settings, setSettings] = useState<Setting[]>([]);
+  const {
+    rows: settings,
+    setRows: setSettings,
+    total,
+    page,
+    rowsPerPage,
+    reload: reloadSettings,
+    handleChangePage,
+    handleChangeRowsPerPage,
+  } = useCursorPagination<Setting>('/api/settings');
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
   const [isCreateModalOpen, setCreateModalOpen] = useState(false);
@@ -59,19 +69,12 @@ export default function SettingsPage() {
   const [snackbarOpen, setSnackbarOpen] = useState(false);
   const [snackbarMessage, setSnackbarMessage] = useState('');
   const [snackbarSeverity, setSnackbarSeverity] = useState<'success' | 'error' | 'info' | 'warning'>('success');
-  const [page, setPage] = useState(0);
-  const [rowsPerPage, setRowsPerPage] = useState(10);
   const router = useRouter();
 
   const fetchSettings = async () => {
     try {
       setLoading(true);
-      const response = await fetch('/api/settings');
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data: Setting[] = await response.json();
-      setSettings(data);
+      await reloadSettings();
     } catch (err) {
       setError('Failed to fetch settings.');
       console.error('Error fetching settings:', err);
@@ -106,15 +109,6 @@ export default function SettingsPage() {
     setActiveSettingForMenu(null);
   };
 
-  const handleChangePage = (event: unknown, newPage: number) => {
-    setPage(newPage);
-  };
-
-  const handleChangeRowsPerPage = (event: React.ChangeEvent<HTMLInputElement>) => {
-    setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
-  };
-
   const Alert = React.forwardRef<HTMLDivElement, AlertProps>(function Alert(props, ref) {
     return <MuiAlert elevation={6} ref={ref} variant="filled" {...props} />;
   });
@@ -184,8 +178,7 @@ export default function SettingsPage() {
         throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
       }
 
-      const createdSetting: Setting = await response.json();
-      setSettings(prevSettings => [...prevSettings, createdSetting]);
+      reloadSettings().catch(err => console.error('Error reloading settings:', err));
       showNotification('Setting created successfully!', 'success');
       setCreateModalOpen(false);
     } catch (err) {
@@ -216,7 +209,7 @@ export default function SettingsPage() {
         const errorData = await response.json().catch(() => ({ message: 'Failed to delete setting.' }));
         throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
       }
-      setSettings(prevSettings => prevSettings.filter(s => s.id !== settingToDelete.id));
+      reloadSettings().catch(err => console.error('Error reloading settings:', err));
       showNotification('Setting deleted successfully!', 'success');
     } catch (err) {
       if (err instanceof Error) {
@@ -289,9 +282,7 @@ export default function SettingsPage() {
                   </TableRow>
                 </TableHead>
                 <TableBody>
-                  {settings
-                    .slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage)
-                    .map(setting => (
+                  {settings.map(setting => (
                     <TableRow
                       hover
                       key={setting.id}
@@ -323,7 +314,7 @@ export default function SettingsPage() {
           </Box>
           <TablePagination
             component="div"
-            count={settings.length}
+            count={total}
             onPageChange={handleChangePage}
             onRowsPerPageChange={handleChangeRowsPerPage}
             page={page}
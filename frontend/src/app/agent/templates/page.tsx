@@ -36,6 +36,7 @@ import TrashIcon from '@heroicons/react/24/solid/TrashIcon';
 import EllipsisVerticalIcon from '@heroicons/react/24/solid/EllipsisVerticalIcon';
 import { useRouter } from 'next/navigation';
 import MuiAlert, { AlertProps } from '@mui/material/Alert';
+import { useCursorPagination } from '@/hooks/use-cursor-pagination';
 
 const dataTypeOptions = [
   { value: 'type_number', label: 'Numero entero' },
@@ -52,7 +53,16 @@ const getDataTypeLabel = (value: string) => {
 };
 
 export default function TemplatesPage() {
-  const [templates, setTemplates] = useState<Template[]>([]);
+  const {
+    rows: templates,
+    setRows: setTemplates,
+    total,
+    page,
+    rowsPerPage,
+    reload: reloadTemplates,
+    handleChangePage,
+    handleChangeRowsPerPage,
+  } = useCursorPagination<Template>('/api/templates');
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
   const [isCreateModalOpen, setCreateModalOpen] = useState(false);
@@ -70,8 +80,6 @@ export default function TemplatesPage() {
   const [activeTemplateForMenu, setActiveTemplateForMenu] = useState<Template | null>(null);
   const [isDeleteModalOpen, setDeleteModalOpen] = useState(false);
   const [templateToDelete, setTemplateToDelete] = useState<Template | null>(null);
-  const [page, setPage] = useState(0);
-  const [rowsPerPage, setRowsPerPage] = useState(10);
   const [snackbarOpen, setSnackbarOpen] = useState(false);
   const [snackbarMessage, setSnackbarMessage] = useState('');
   const [snackbarSeverity, setSnackbarSeverity] = useState<'success' | 'error' | 'info' | 'warning'>('success');
@@ -80,12 +88,7 @@ export default function TemplatesPage() {
   const fetchTemplates = async () => {
     try {
       setLoading(true);
-      const response = await fetch('/api/templates');
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data: Template[] = await response.json();
-      setTemplates(data);
+      await reloadTemplates();
     } catch (err) {
       setError('Failed to fetch templates.');
       console.error('Error fetching templates:', err);
@@ -120,15 +123,6 @@ export default function TemplatesPage() {
     setActiveTemplateForMenu(null);
   };
 
-  const handleChangePage = (event: unknown, newPage: number) => {
-    setPage(newPage);
-  };
-
-  const handleChangeRowsPerPage = (event: React.ChangeEvent<HTMLInputElement>) => {
-    setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
-  };
-
   const Alert = React.forwardRef<HTMLDivElement, AlertProps>(function Alert(props, ref) {
     return <MuiAlert elevation={6} ref={ref} variant="filled" {...props} />;
   });
@@ -199,8 +193,7 @@ export default function TemplatesPage() {
         throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
       }
 
-      const createdTemplate: Template = await response.json();
-      setTemplates(prevTemplates => [...prevTemplates, createdTemplate]);
+      reloadTemplates().catch(err => console.error('Error reloading templates:', err));
       showNotification('Template created successfully!', 'success');
       setCreateModalOpen(false);
     } catch (err) {
@@ -231,7 +224,7 @@ export default function TemplatesPage() {
         const errorData = await response.json().catch(() => ({ message: 'Failed to delete template.' }));
         throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
       }
-      setTemplates(prevTemplates => prevTemplates.filter(t => t.id !== templateToDelete.id));
+      reloadTemplates().catch(err => console.error('Error reloading templates:', err));
       showNotification('Template deleted successfully!', 'success');
     } catch (err) {
       if (err instanceof Error) {
@@ -295,9 +288,7 @@ export default function TemplatesPage() {
                   </TableRow>
                 </TableHead>
                 <TableBody>
-                  {templates
-                    .slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage)
-                    .map(template => (
+                  {templates.map(template => (
                     <TableRow
                       hover
                       key={template.id}
@@ -335,7 +326,7 @@ export default function TemplatesPage() {
           </Box>
           <TablePagination
             component="div"
-            count={templates.length}
+            count={total}
             onPageChange={handleChangePage}
             onRowsPerPageChange={handleChangeRowsPerPage}
             page={page}
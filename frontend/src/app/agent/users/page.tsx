@@ -38,8 +38,19 @@ import EllipsisVerticalIcon from '@heroicons/react/24/solid/EllipsisVerticalIcon
 import { useRouter } from 'next/navigation';
 
 import MuiAlert, { AlertProps } from '@mui/material/Alert';
+import { fetchAllPages } from '@/lib/fetch-all-pages';
+import { useCursorPagination } from '@/hooks/use-cursor-pagination';
 export default function UsersPage() {
-  const [users, setUsers] = useState<User[]>([]);
+  const {
+    rows: users,
+    setRows: setUsers,
+    total,
+    page,
+    rowsPerPage,
+    reload: reloadUsers,
+    handleChangePage,
+    handleChangeRowsPerPage,
+  } = useCursorPagination<User>('/api/users');
   const [clients, setClients] = useState<Client[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
@@ -57,8 +68,6 @@ export default function UsersPage() {
   const [activeUserForMenu, setActiveUserForMenu] = useState<User | null>(null);
   const [isDeleteModalOpen, setDeleteModalOpen] = useState(false);
   const [userToDelete, setUserToDelete] = useState<User | null>(null);
-  const [page, setPage] = useState(0);
-  const [rowsPerPage, setRowsPerPage] = useState(10);
   const [snackbarOpen, setSnackbarOpen] = useState(false);
   const [snackbarMessage, setSnackbarMessage] = useState('');
   const [isIntegrityErrorModalOpen, setIntegrityErrorModalOpen] = useState(false);
@@ -68,12 +77,7 @@ export default function UsersPage() {
 
   const fetchUsers = async () => {
     try {
-      const response = await fetch('/api/users');
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data: User[] = await response.json();
-      setUsers(data);
+      await reloadUsers();
     } catch (err) {
       throw new Error('Failed to fetch users.');
     }
@@ -81,11 +85,7 @@ export default function UsersPage() {
 
   const fetchClients = async () => {
     try {
-      const response = await fetch('/api/clients');
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data: Client[] = await response.json();
+      const data = await fetchAllPages<Client>('/api/clients');
       setClients(data);
     } catch (err) {
       throw new Error('Failed to fetch clients.');
@@ -133,15 +133,6 @@ export default function UsersPage() {
     setActiveUserForMenu(null);
   };
 
-  const handleChangePage = (event: unknown, newPage: number) => {
-    setPage(newPage);
-  };
-
-  const handleChangeRowsPerPage = (event: React.ChangeEvent<HTMLInputElement>) => {
-    setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
-  };
-
   const Alert = React.forwardRef<HTMLDivElement, AlertProps>(function Alert(props, ref) {
     return <MuiAlert elevation={6} ref={ref} variant="filled" {...props} />;
   });
@@ -207,8 +198,7 @@ export default function UsersPage() {
         throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
       }
 
-      const createdUser: User = await response.json();
-      setUsers(prevUsers => [...prevUsers, createdUser]);
+      reloadUsers().catch(err => console.error('Error reloading users:', err));
       showNotification('User created successfully!', 'success');
       setCreateModalOpen(false);
     } catch (err) {
@@ -238,7 +228,7 @@ export default function UsersPage() {
     setDeleteModalOpen(false); // Close confirmation dialog
 
     if (response.ok) {
-      setUsers(prevUsers => prevUsers.filter(u => u.id !== userToDelete.id));
+      reloadUsers().catch(err => console.error('Error reloading users:', err));
       showNotification('User deleted successfully!', 'success');
     } else {
       const errorData = await response.json().catch(() => ({}));
@@ -302,9 +292,7 @@ export default function UsersPage() {
                   </TableRow>
                 </TableHead>
                 <TableBody>
-                  {users
-                    .slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage)
-                    .map(user => (
+                  {users.map(user => (
                     <TableRow
                       hover
                       key={user.id}
@@ -338,7 +326,7 @@ export default function UsersPage() {
           </Box>
           <TablePagination
             component="div"
-            count={users.length}
+            count={total}
             onPageChange={handleChangePage}
             onRowsPerPageChange={handleChangeRowsPerPage}
             page={page}
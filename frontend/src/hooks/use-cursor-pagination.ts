@@ -0,0 +1,73 @@
+import * as React from 'react';
+
+import { fetchPage } from '@/lib/fetch-all-pages';
+
+interface CursorPagination<T> {
+  rows: T[];
+  setRows: React.Dispatch<React.SetStateAction<T[]>>;
+  total: number;
+  page: number;
+  rowsPerPage: number;
+  reload: () => Promise<void>;
+  handleChangePage: (event: unknown, newPage: number) => void;
+  handleChangeRowsPerPage: (event: React.ChangeEvent<HTMLInputElement>) => void;
+}
+
+// Reads a paginated list endpoint one page at a time for a TablePagination.
+// The cursor of every page reached is kept, so going back does not re-read the
+// list from the start. The total (X-Total-Count) is only requested when the
+// list is (re)loaded from a mutation or a page size change.
+export function useCursorPagination<T>(url: string, initialRowsPerPage = 10): CursorPagination<T> {
+  const [rows, setRows] = React.useState<T[]>([]);
+  const [total, setTotal] = React.useState<number>(0);
+  const [page, setPage] = React.useState<number>(0);
+  const [rowsPerPage, setRowsPerPage] = React.useState<number>(initialRowsPerPage);
+  const cursorsRef = React.useRef<(string | null)[]>([null]);
+
+  const load = React.useCallback(
+    async (newPage: number, limit: number, includeTotal: boolean): Promise<void> => {
+      const cursor = cursorsRef.current[newPage];
+      if (cursor === undefined) {
+        return;
+      }
+      const result = await fetchPage<T>(url, limit, cursor, includeTotal);
+      if (result.items.length === 0 && newPage > 0) {
+        // The last page was emptied (e.g. by a delete): show the one before it
+        await load(newPage - 1, limit, includeTotal);
+        return;
+      }
+      cursorsRef.current = [...cursorsRef.current.slice(0, newPage + 1), result.nextCursor];
+      setRows(result.items);
+      if (result.total !== null) {
+        setTotal(result.total);
+      }
+      setPage(newPage);
+    },
+    [url]
+  );
+
+  const reload = React.useCallback(() => load(page, rowsPerPage, true), [load, page, rowsPerPage]);
+
+  const handleChangePage = React.useCallback(
+    (event: unknown, newPage: number) => {
+      load(newPage, rowsPerPage, false).catch((err) => {
+        console.error('Error loading page:', err);
+      });
+    },
+    [load, rowsPerPage]
+  );
+
+  const handleChangeRowsPerPage = React.useCallback(
+    (event: React.ChangeEvent<HTMLInputElement>) => {
+      const limit = parseInt(event.target.value, 10);
+      cursorsRef.current = [null];
+      setRowsPerPage(limit);
+      load(0, limit, true).catch((err) => {
+        console.error('Error loading page:', err);
+      });
+    },
+    [load]
+  );
+
+  return { rows, setRows, total, page, rowsPerPage, reload, handleChangePage, handleChangeRowsPerPage };
+}
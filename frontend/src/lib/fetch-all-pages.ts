@@ -0,0 +1,48 @@
+// The core list endpoints are paginated: each response holds one page and the
+// X-Next-Cursor header points to the next one. Tables read one page at a time
+// with fetchPage; fetchAllPages is for lookups (selects) that need every row.
+const PAGE_SIZE = 1000;
+
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+  total: number | null;
+}
+
+export async function fetchPage<T>(
+  url: string,
+  limit: number,
+  cursor: string | null,
+  includeTotal = false,
+): Promise<Page<T>> {
+  const separator = url.includes('?') ? '&' : '?';
+  const pageUrl = `${url}${separator}limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}${includeTotal ? '&include_total=true' : ''}`;
+  const response = await fetch(pageUrl);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  const total = response.headers.get('X-Total-Count');
+  return {
+    items: (await response.json()) as T[],
+    nextCursor: response.headers.get('X-Next-Cursor'),
+    total: total === null ? null : Number(total),
+  };
+}
+
+export async function fetchAllPages<T>(url: string): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const page: Page<T> = await fetchPage<T>(url, PAGE_SIZE, cursor);
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+
+  return items;
+}
+
+export async function fetchTotalCount(url: string): Promise<number> {
+  const page = await fetchPage<unknown>(url, 1, null, true);
+  return page.total ?? 0;
+}
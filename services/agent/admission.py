@@ -0,0 +1,238 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+# Idle buckets are pruned once the map grows past this size
+MAX_IDLE_BUCKETS = 50_000
+BUCKET_IDLE_SECONDS = 600.0
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    """Limits read from the settings table. A rate of 0 (or a cap of 0) means unlimited."""
+    client_rate: float = 0.0
+    client_burst: float = 0.0
+    user_rate: float = 0.0
+    user_burst: float = 0.0
+    max_inflight: int = 0
+    queue_timeout: float = 0.0
+    overrides: tuple = ()  # ((client_code, rate, burst), ...)
+
+    @classmethod
+    def from_settings(cls, values: Dict[str, str]) -> "AdmissionLimits":
+        def number(key: str, default: float = 0.0) -> float:
+            try:
+                return float(values.get(key, default))
+            except (TypeError, ValueError):
+                return default
+
+        overrides = []
+        for key, value in values.items():
+            if key.startswith("RATE_CLIENT_PER_SEC:"):
+                client_code = key.split(":", 1)[1]
+                rate = number(key)
+                overrides.append((client_code, rate, number(f"RATE_CLIENT_BURST:{client_code}", rate)))
+
+        client_rate = number("RATE_CLIENT_PER_SEC")
+        user_rate = number("RATE_USER_PER_SEC")
+        return cls(
+            client_rate=client_rate,
+            client_burst=number("RATE_CLIENT_BURST", client_rate),
+            user_rate=user_rate,
+            user_burst=number("RATE_USER_BURST", user_rate),
+            max_inflight=int(number("MAX_INFLIGHT_QUESTIONS")),
+            queue_timeout=number("ADMISSION_QUEUE_TIMEOUT_MS") / 1000,
+            overrides=tuple(overrides),
+        )
+
+    def for_client(self, client_code: str):
+        for code, rate, burst in self.overrides:
+            if code == client_code:
+                return rate, burst
+        return self.client_rate, self.client_burst
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = now
+
+    def reserve(self, now: float, max_wait: float) -> Optional[float]:
+        """
+        Takes one token, possibly borrowing against the future refill.
+
+        Returns how long the caller must wait before proceeding (0 when a token
+        was available), or None if that wait would exceed max_wait.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        wait = (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+    def refund(self):
+        """Returns a token taken by reserve() for a request that was rejected elsewhere."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def retry_after(self) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class AdmissionController:
+    """
+    Admission control for the agent ingress.
+
+    A request must get a token from its client's bucket and its user's bucket
+    and a slot under the global in-flight cap. When the wait for any of them
+    fits in the configured queue timeout the request waits; otherwise it fails
+    fast with 429 and a Retry-After header.
+    """
+
+    def __init__(self):
+        self.client_buckets: Dict[str, TokenBucket] = {}
+        self.user_buckets: Dict[str, TokenBucket] = {}
+        self.inflight = 0
+        self.waiting = 0
+        self._slot_freed = asyncio.Condition()
+        self.admitted = 0
+        self.rejected = {"client_rate": 0, "user_rate": 0, "concurrency": 0}
+        self._limits: Optional[AdmissionLimits] = None
+        self._limits_source = None
+
+    def limits(self, values: Dict[str, str]) -> AdmissionLimits:
+        # Re-parse only when the settings snapshot changed
+        if values is not self._limits_source:
+            self._limits = AdmissionLimits.from_settings(values)
+            self._limits_source = values
+        return self._limits
+
+    @asynccontextmanager
+    async def admit(self, client_code: str, user_key: str, values: Dict[str, str]):
+        limits = self.limits(values)
+        now = time.monotonic()
+
+        # The user bucket goes first: a user over their own limit must not drain the shared client budget
+        wait = self._take(self.user_buckets, user_key, limits.user_rate, limits.user_burst, now,
+                          limits.queue_timeout, "user_rate")
+        client_rate, client_burst = limits.for_client(client_code)
+        try:
+            wait = max(wait, self._take(self.client_buckets, client_code, client_rate, client_burst, now,
+                                        limits.queue_timeout, "client_rate"))
+        except HTTPException:
+            self._refund(self.user_buckets, user_key)
+            raise
+        if wait > 0:
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.waiting -= 1
+
+        try:
+            await self._acquire_slot(limits)
+        except HTTPException:
+            # Rejected at the concurrency cap: retries must not keep draining the rate budgets
+            self._refund(self.user_buckets, user_key)
+            self._refund(self.client_buckets, client_code)
+            raise
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            async with self._slot_freed:
+                self._slot_freed.notify()
+
+    def _take(self, buckets: Dict[str, TokenBucket], key: str, rate: float, burst: float, now: float,
+              max_wait: float, reason: str) -> float:
+        if rate <= 0:
+            return 0.0
+        bucket = buckets.get(key)
+        if bucket is None or bucket.rate != rate or bucket.capacity != max(burst, 1.0):
+            if len(buckets) >= MAX_IDLE_BUCKETS:
+                self._prune(buckets, now)
+            bucket = buckets[key] = TokenBucket(rate, burst, now)
+        wait = bucket.reserve(now, max_wait)
+        if wait is None:
+            self.rejected[reason] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please retry later.",
+                headers={"Retry-After": str(math.ceil(bucket.retry_after()))},
+            )
+        return wait
+
+    @staticmethod
+    def _refund(buckets: Dict[str, TokenBucket], key: str):
+        # Buckets only exist for limited keys (rate > 0)
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.refund()
+
+    async def _acquire_slot(self, limits: AdmissionLimits):
+        if limits.max_inflight <= 0 or self.inflight < limits.max_inflight:
+            self.inflight += 1
+            return
+        if limits.queue_timeout <= 0:
+            self.rejected["concurrency"] += 1
+            raise HTTPException(status_code=429, detail="Too many requests, please retry later.",
+                                headers={"Retry-After": "1"})
+
+        self.waiting += 1
+        try:
+            async with self._slot_freed:
+                await asyncio.wait_for(
+                    self._slot_freed.wait_for(lambda: self.inflight < limits.max_inflight),
+                    timeout=limits.queue_timeout,
+                )
+                self.inflight += 1
+        except asyncio.TimeoutError:
+            self.rejected["concurrency"] += 1
+            raise HTTPException(status_code=429, detail="Too many requests, please retry later.",
+                                headers={"Retry-After": "1"})
+        finally:
+            self.waiting -= 1
+
+    @staticmethod
+    def _prune(buckets: Dict[str, TokenBucket], now: float):
+        idle = [key for key, bucket in buckets.items() if now - bucket.updated > BUCKET_IDLE_SECONDS]
+        for key in idle:
+            del buckets[key]
+
+    def stats(self, values: Dict[str, str]) -> dict:
+        limits = self.limits(values)
+        now = time.monotonic()
+        return {
+            "limits": {
+                "client_rate": limits.client_rate,
+                "client_burst": limits.client_burst,
+                "user_rate": limits.user_rate,
+                "user_burst": limits.user_burst,
+                "max_inflight": limits.max_inflight,
+                "queue_timeout_ms": int(limits.queue_timeout * 1000),
+                "client_overrides": {code: {"rate": rate, "burst": burst} for code, rate, burst in limits.overrides},
+            },
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "client_tokens": {
+                code: round(min(bucket.capacity, bucket.tokens + (now - bucket.updated) * bucket.rate), 2)
+                for code, bucket in self.client_buckets.items()
+            },
+            "user_buckets": len(self.user_buckets),
+        }
@@ -0,0 +1,123 @@
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+Deliver = Callable[[int, str], Awaitable[None]]
+
+BACKPLANE_CHANNEL = "ws_messages"
+
+
+class Backplane:
+    """
+    Pub/sub used by ConnectionManager to reach sockets held by other workers.
+
+    publish() is called after the message was already delivered to the local
+    sockets, so implementations only need to reach the other processes;
+    messages coming back from this same process must be ignored.
+    """
+
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def publish(self, user_id: int, message: str):
+        raise NotImplementedError
+
+
+class InMemoryBackplane(Backplane):
+    """
+    Connects several ConnectionManagers living in the same process.
+
+    Instances created with the same hub behave like separate workers; it is
+    meant for tests and single-process development.
+    """
+
+    def __init__(self, hub: Optional[List["InMemoryBackplane"]] = None):
+        self.hub = hub if hub is not None else []
+        self.deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+        self.hub.append(self)
+
+    async def stop(self):
+        if self in self.hub:
+            self.hub.remove(self)
+
+    async def publish(self, user_id: int, message: str):
+        for peer in list(self.hub):
+            if peer is not self and peer.deliver is not None:
+                await peer.deliver(user_id, message)
+
+
+class PostgresBackplane(Backplane):
+    """
+    Fans messages out with NOTIFY on BACKPLANE_CHANNEL.
+
+    Every agent worker LISTENs through the shared PgListener; no extra
+    infrastructure is needed. NOTIFY payloads are limited to 8000 bytes, so
+    longer messages are split into chunks and reassembled on arrival.
+    """
+
+    CHUNK_CHARS = 1200  # Worst case ~6 bytes per char once JSON-escaped
+    CHUNK_TTL = 30.0
+
+    def __init__(self, engine, listener):
+        self.engine = engine
+        self.origin = uuid.uuid4().hex
+        self.deliver: Optional[Deliver] = None
+        self._partials: Dict[str, dict] = {}
+        listener.subscribe(BACKPLANE_CHANNEL, self._on_notify)
+
+    async def publish(self, user_id: int, message: str):
+        if len(message) <= self.CHUNK_CHARS:
+            payloads = [{"o": self.origin, "u": user_id, "m": message}]
+        else:
+            message_id = uuid.uuid4().hex
+            parts = [message[i:i + self.CHUNK_CHARS] for i in range(0, len(message), self.CHUNK_CHARS)]
+            payloads = [
+                {"o": self.origin, "u": user_id, "id": message_id, "i": index, "n": len(parts), "m": part}
+                for index, part in enumerate(parts)
+            ]
+
+        async with self.engine.connect() as conn:
+            for payload in payloads:
+                await conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": BACKPLANE_CHANNEL, "payload": json.dumps(payload, ensure_ascii=False)},
+                )
+            await conn.commit()
+
+    async def _on_notify(self, payload: Optional[str]):
+        if not payload or self.deliver is None:
+            return
+        data = json.loads(payload)
+        if data["o"] == self.origin:
+            return
+
+        if "id" not in data:
+            await self.deliver(data["u"], data["m"])
+            return
+
+        now = time.monotonic()
+        for key in [key for key, partial in self._partials.items() if now - partial["at"] > self.CHUNK_TTL]:
+            del self._partials[key]
+
+        partial = self._partials.setdefault(data["id"], {"at": now, "parts": [None] * data["n"]})
+        partial["parts"][data["i"]] = data["m"]
+        if all(part is not None for part in partial["parts"]):
+            del self._partials[data["id"]]
+            await self.deliver(data["u"], "".join(partial["parts"]))
+
+
+def build_backplane(kind: str, engine, listener) -> Backplane:
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "postgres":
+        return PostgresBackplane(engine, listener)
+    raise ValueError(f"Unknown WS_BACKPLANE '{kind}', expected 'postgres' or 'memory'")
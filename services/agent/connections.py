@@ -0,0 +1,199 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from fastapi import WebSocket
+
+from backplane import Backplane
+
+# Signals that carry no data; several queued copies are equivalent to one
+COALESCIBLE_MESSAGES = {"new_message"}
+
+# Close code 1013: "Try Again Later", sent to consumers that cannot keep up
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class SocketConnection:
+    """
+    One WebSocket with a bounded outbound queue drained by its own writer task.
+
+    Producers never await the socket: offer() either queues the message or
+    reports an overflow, so one slow client cannot hold up the others.
+    """
+
+    def __init__(self, user_id: int, websocket: WebSocket, manager: "ConnectionManager"):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.manager = manager
+        self.pending: deque = deque()
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+        # While paused, live messages are queued but not written (used during resync)
+        self.paused = False
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def offer(self, message: str) -> bool:
+        if self.closed:
+            return False
+
+        if message in COALESCIBLE_MESSAGES and any(item == message for item, _ in self.pending):
+            self.manager.coalesced += 1
+            return True
+
+        if len(self.pending) >= self.manager.max_queue:
+            if self.manager.overflow_policy != "coalesce" or not self._coalesce():
+                return False
+
+        self.pending.append((message, time.monotonic()))
+        self._ready.set()
+        return True
+
+    def resume(self, replay: List[str], last_replayed_id: Optional[int], truncated: bool = False):
+        """
+        Writes the replayed messages first, then the live ones queued meanwhile,
+        skipping live messages the replay already covered. After a truncated
+        replay every queued row is skipped: the client re-syncs from the
+        replay_truncated frame and would otherwise see rows past a gap.
+        """
+        live = self.pending
+        if truncated:
+            live = deque(item for item in live if not self._covered(item[0], float("inf")))
+        elif last_replayed_id is not None:
+            live = deque(item for item in live if not self._covered(item[0], last_replayed_id))
+        now = time.monotonic()
+        self.pending = deque((message, now) for message in replay)
+        self.pending.extend(live)
+        self.paused = False
+        self._ready.set()
+
+    @staticmethod
+    def _covered(message: str, last_replayed_id: float) -> bool:
+        if not message.startswith("{"):
+            return False
+        try:
+            message_id = json.loads(message).get("id")
+        except ValueError:
+            return False
+        return isinstance(message_id, int) and message_id <= last_replayed_id
+
+    def _coalesce(self) -> bool:
+        """Drops queued signals to make room; returns False if nothing could be freed."""
+        before = len(self.pending)
+        self.pending = deque(item for item in self.pending if item[0] not in COALESCIBLE_MESSAGES)
+        self.manager.coalesced += before - len(self.pending)
+        return len(self.pending) < self.manager.max_queue
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        self.pending.clear()
+        self._ready.set()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _write_loop(self):
+        while not self.closed:
+            if not self.pending or self.paused:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            message, queued_at = self.pending.popleft()
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(message), timeout=self.manager.send_timeout)
+            except Exception as e:
+                print(f"Dropping WebSocket of user {self.user_id}: {e!r}")
+                self.manager.dropped += 1
+                self.manager.disconnect(self.user_id, self)
+                await self.close(SLOW_CONSUMER_CLOSE_CODE)
+                return
+            self.manager.record_send(started - queued_at, time.monotonic() - started)
+
+
+class ConnectionManager:
+    """
+    Tracks every socket of every user connected to this worker.
+
+    A user may have several sockets (e.g. browser tabs); messages go to all of
+    them through their own queues. Messages for sockets held by other workers
+    go through the backplane.
+    """
+
+    def __init__(self, backplane: Backplane, max_queue: int = 64, overflow_policy: str = "drop",
+                 send_timeout: float = 10.0):
+        self.active_connections: Dict[int, Set[SocketConnection]] = {}
+        self.backplane = backplane
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.queue_wait_total = 0.0
+        self.send_time_total = 0.0
+        self.send_time_max = 0.0
+
+    async def connect(self, user_id: int, websocket: WebSocket, paused: bool = False) -> SocketConnection:
+        await websocket.accept()
+        connection = SocketConnection(user_id, websocket, self)
+        connection.paused = paused
+        self.active_connections.setdefault(user_id, set()).add(connection)
+        connection.start()
+        return connection
+
+    def disconnect(self, user_id: int, connection: SocketConnection):
+        connections = self.active_connections.get(user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self.active_connections[user_id]
+
+    async def send_personal_message(self, message: str, user_id: int):
+        # The socket may be held by another worker or replica; the backplane reaches those
+        await self.deliver_local(user_id, message)
+        try:
+            await self.backplane.publish(user_id, message)
+        except Exception as e:
+            print(f"Error publishing message for user {user_id} to the backplane: {e}")
+
+    async def deliver_local(self, user_id: int, message: str):
+        for connection in list(self.active_connections.get(user_id, ())):
+            if not connection.offer(message):
+                print(f"Dropping slow WebSocket of user {user_id}: outbound queue full")
+                self.dropped += 1
+                self.disconnect(user_id, connection)
+                asyncio.create_task(connection.close(SLOW_CONSUMER_CLOSE_CODE))
+
+    def record_send(self, queue_wait: float, send_time: float):
+        self.sent += 1
+        self.queue_wait_total += queue_wait
+        self.send_time_total += send_time
+        if send_time > self.send_time_max:
+            self.send_time_max = send_time
+
+    def stats(self) -> dict:
+        depths = [len(c.pending) for connections in self.active_connections.values() for c in connections]
+        return {
+            "users": len(self.active_connections),
+            "sockets": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "max_queue": self.max_queue,
+            "overflow_policy": self.overflow_policy,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "avg_queue_wait_ms": round(self.queue_wait_total / self.sent * 1000, 3) if self.sent else 0.0,
+            "avg_send_ms": round(self.send_time_total / self.sent * 1000, 3) if self.sent else 0.0,
+            "max_send_ms": round(self.send_time_max * 1000, 3),
+        }
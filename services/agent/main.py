@@ -1,7 +1,8 @@
-from fastapi import FastAPI, Depends, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, Depends, WebSocket, WebSocketDisconnect, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session, joinedload
-from typing import Dict, List
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 from datetime import date, datetime
 import asyncio
 import sys
@@ -9,14 +10,27 @@ import os
 import httpx
 import json
 import uuid
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+load_dotenv()
 
-from shared.database import get_db, engine
-from shared.models import Base, User, Client, Setting, Attribute, Communication, Template
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-load_dotenv()
+from shared.database import get_async_db, engine, async_engine, AsyncSessionLocal
+from shared.models import Base, User, Client, Communication, WebhookOutbox
+from shared.http_clients import http_clients
+from shared.metrics import MetricsMiddleware, Gauge, instrument_pool, metrics_response, register
+from shared.query_stats import QueryStatsMiddleware, instrument_engine
+from shared.notify import PgListener
+from shared.settings_cache import settings_cache, SETTINGS_CHANNEL
+from shared.rules import rules_cache, RULES_CHANNEL
+from shared.session_cache import session_cache, SESSION_CHANNEL, CLIENT_CHANNEL
+from product_cache import ProductCache
+from outbox import OutboxDispatcher, enqueue, enqueue_coalesced
+from backplane import build_backplane
+from connections import ConnectionManager
+from admission import AdmissionController
 
 QUESTION_ENDPOINT = os.getenv("QUESTION_ENDPOINT", "/question")
 ANSWER_ENDPOINT = os.getenv("ANSWER_ENDPOINT", "/answer")
@@ -24,10 +38,67 @@ CLIENT_ENDPOINT = os.getenv("CLIENT_ENDPOINT", "/client")
 PRODUCTS_ENDPOINT = os.getenv("PRODUCT_ENDPOINT", "/products")
 RULES_ENDPOINT = os.getenv("RULES_ENDPOINT", "/rules")
 
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "60"))
+PRODUCT_CACHE_STALE_TTL = float(os.getenv("PRODUCT_CACHE_STALE_TTL", "300"))
+
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "10"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BASE_DELAY = float(os.getenv("OUTBOX_BASE_DELAY", "1"))
+OUTBOX_MAX_DELAY = float(os.getenv("OUTBOX_MAX_DELAY", "300"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+
+# Debounce window for consecutive prompts of a session; 0 disables coalescing
+COALESCE_WINDOW_MS = int(os.getenv("COALESCE_WINDOW_MS", "0"))
+COALESCE_MAX_BATCH = int(os.getenv("COALESCE_MAX_BATCH", "4"))
+
+WS_BACKPLANE = os.getenv("WS_BACKPLANE", "postgres")
+WS_MAX_QUEUE = int(os.getenv("WS_MAX_QUEUE", "64"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop")  # drop | coalesce
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+# "trigger": new communication rows are pushed from the AFTER INSERT trigger's NOTIFY
+# and ANSWER_ENDPOINT is a no-op kept for compatibility. "answer": legacy behaviour.
+COMMUNICATION_PUSH = os.getenv("COMMUNICATION_PUSH", "trigger")
+COMMUNICATION_PUSH_TYPES = set(os.getenv("COMMUNICATION_PUSH_TYPES", "ai").split(","))
+COMMUNICATION_CHANNEL = "communication_inserted"
+
+WS_REPLAY_LIMIT = int(os.getenv("WS_REPLAY_LIMIT", "500"))
+
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Agent Service")
+instrument_pool(engine, "sync")
+instrument_pool(async_engine.sync_engine, "async")
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+listener = PgListener()
+listener.subscribe(SETTINGS_CHANNEL, settings_cache.invalidate)
+listener.subscribe(RULES_CHANNEL, rules_cache.invalidate)
+listener.subscribe(SESSION_CHANNEL, session_cache.invalidate_session)
+listener.subscribe(CLIENT_CHANNEL, session_cache.invalidate_client)
+
+backplane = build_backplane(WS_BACKPLANE, async_engine, listener)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_clients.start()
+    await backplane.start(manager.deliver_local)
+    await listener.start()
+    await dispatcher.start()
+    try:
+        yield
+    finally:
+        await dispatcher.stop()
+        await listener.stop()
+        await backplane.stop()
+        await http_clients.close()
+        await async_engine.dispose()
+
+
+app = FastAPI(title="Agent Service", lifespan=lifespan)
 
 FRONTEND_PORT = os.getenv("FRONTEND_PORT", "3000")
 origins = [
@@ -42,90 +113,167 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 
+manager = ConnectionManager(
+    backplane,
+    max_queue=WS_MAX_QUEUE,
+    overflow_policy=WS_OVERFLOW_POLICY,
+    send_timeout=WS_SEND_TIMEOUT,
+)
+product_cache = ProductCache(ttl=PRODUCT_CACHE_TTL, stale_ttl=PRODUCT_CACHE_STALE_TTL)
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}
+register(Gauge(
+    "websocket_connections_open", "WebSockets currently open on this worker.",
+    function=lambda: sum(len(connections) for connections in manager.active_connections.values()),
+))
 
-    async def connect(self, user_id: int, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
 
-    def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+async def call_n8n_webhook(session_id: str, outbox_payload: dict):
+    """Sends one outbox entry to n8n. Raises on failure so the dispatcher can retry it."""
+    settings = await settings_cache.aget()
+    if not settings.url_agent:
+        raise RuntimeError("URL_AGENT setting is not configured")
 
-    async def send_personal_message(self, message: str, user_id: int):
-        if user_id in self.active_connections:
-            await self.active_connections[user_id].send_text(message)
+    webhook_url = settings.url_agent
+    url_host = settings.url_host
 
+    prompt = outbox_payload["prompt"]
 
-manager = ConnectionManager()
+    agent_port = os.getenv("AGENT_PORT", "8001")
 
+    payload = {
+        "session_id": session_id,
+        "answer_ep": f"{url_host}:{agent_port}{ANSWER_ENDPOINT}",
+        "client_ep": f"{url_host}:{agent_port}{CLIENT_ENDPOINT}",
+        "rule_ep": f"{url_host}:{agent_port}{RULES_ENDPOINT}",
+        "product_ep": f"{url_host}:{agent_port}{PRODUCTS_ENDPOINT}",
 
-async def call_n8n_webhook(db: Session, user: User, client: Client, text: str):
-    webhook_setting = db.query(Setting).filter(Setting.key == "URL_AGENT").first()
-    host_setting = db.query(Setting).filter(Setting.key == "URL_HOST").first()
-    if webhook_setting and webhook_setting.value:
-        webhook_url = webhook_setting.value
+        "prompt": prompt,
+    }
+    response = await http_clients.webhook.post(webhook_url, json=payload, timeout=http_clients.webhook_timeout)
+    response.raise_for_status()
+
+
+dispatcher = OutboxDispatcher(
+    AsyncSessionLocal,
+    call_n8n_webhook,
+    concurrency=OUTBOX_CONCURRENCY,
+    batch_size=OUTBOX_BATCH_SIZE,
+    max_attempts=OUTBOX_MAX_ATTEMPTS,
+    base_delay=OUTBOX_BASE_DELAY,
+    max_delay=OUTBOX_MAX_DELAY,
+    poll_interval=OUTBOX_POLL_INTERVAL,
+    coalesce_max_batch=COALESCE_MAX_BATCH if COALESCE_WINDOW_MS > 0 else 1,
+)
 
-        prompt = text
 
-        agent_port = os.getenv("AGENT_PORT", "8001")
+async def resolve_client(db: AsyncSession, session_id: str):
+    record = await session_cache.get_session(db, session_id)
+    client = await session_cache.get_client(db, record.client_id) if record else None
+    if client is None:
+        raise HTTPException(status_code=404, detail="User or associated client with the specified session_id not found")
+    return client
 
-        payload = {
-            "session_id": user.session_id,
-            "answer_ep": f"{host_setting.value}:{agent_port}{ANSWER_ENDPOINT}",
-            "client_ep": f"{host_setting.value}:{agent_port}{CLIENT_ENDPOINT}",
-            "rule_ep": f"{host_setting.value}:{agent_port}{RULES_ENDPOINT}",
-            "product_ep": f"{host_setting.value}:{agent_port}{PRODUCTS_ENDPOINT}",
 
-            "prompt": prompt,
-        }
-        try:
-            async with httpx.AsyncClient() as http_client:
-                await http_client.post(webhook_url, json=payload)
-        except httpx.RequestError as e:
-            print(f"Error calling n8n webhook: {e}")
+admission = AdmissionController()
 
 
 @app.get(QUESTION_ENDPOINT)
-async def add_message(username: str, client_code: str, texto: str, db: Session = Depends(get_db)):
-    user = db.query(User).join(Client).filter(
-        User.username == username,
-        Client.client_code == client_code
-    ).first()
+async def add_message(username: str, client_code: str, texto: str, db: AsyncSession = Depends(get_async_db)):
+    # Limits live in the settings table (RATE_CLIENT_PER_SEC, RATE_USER_PER_SEC, MAX_INFLIGHT_QUESTIONS, ...)
+    settings = await settings_cache.aget()
+    async with admission.admit(client_code, f"{client_code}:{username}", settings.values):
+        return await accept_question(username, client_code, texto, db)
+
+
+async def accept_question(username: str, client_code: str, texto: str, db: AsyncSession):
+    result = await db.execute(
+        select(User).join(Client).where(
+            User.username == username,
+            Client.client_code == client_code
+        )
+    )
+    user = result.scalars().first()
 
     if not user:
-        client = db.query(Client).filter(Client.client_code == client_code).first()
+        result = await db.execute(select(Client).where(Client.client_code == client_code))
+        client = result.scalars().first()
         if not client:
             raise HTTPException(status_code=404, detail=f"Client with code '{client_code}' not found")
 
-        user = User(username=username, client_id=client.id)
+        user = User(username=username, client_id=client.id, session_id=str(uuid.uuid4()))
         db.add(user)
-        db.commit()
-        db.refresh(user)
-        
-        user.session_id = str(uuid.uuid4())
-        db.commit()
-
+        await db.flush()
+
+    # The webhook call is durable: it commits with the user and is delivered by the dispatcher
+    if COALESCE_WINDOW_MS > 0:
+        window = COALESCE_WINDOW_MS / 1000
+        await enqueue_coalesced(db, user.session_id, {"prompt": texto}, window, COALESCE_MAX_BATCH)
+        await db.commit()
+        dispatcher.wake(window)
     else:
-        client = user.client
+        enqueue(db, user.session_id, {"prompt": texto})
+        await db.commit()
+        dispatcher.wake()
 
     asyncio.create_task(manager.send_personal_message("new_message", user.id))
-    asyncio.create_task(call_n8n_webhook(db, user, client, texto))
 
     return {"status": "message received"}
 
 
+async def push_inserted_communication(payload: Optional[str]):
+    """Delivers a row announced by trg_communication_notify_insert to the sockets held by this worker."""
+    if not payload:
+        return
+    data = json.loads(payload)
+    user_id = data.get("user_id")
+    # Every worker receives the notification; only those holding a socket of the user act on it
+    if user_id not in manager.active_connections:
+        return
+
+    if "message" not in data:
+        # The row was too large for a NOTIFY payload
+        async with AsyncSessionLocal() as db:
+            communication = await db.get(Communication, data["id"])
+        if communication is None:
+            return
+        data["message"] = communication.message
+        data["created_at"] = communication.created_at.isoformat() if communication.created_at else None
+
+    message = data["message"]
+    if isinstance(message, dict) and message.get("type") not in COMMUNICATION_PUSH_TYPES:
+        return
+
+    response_data = {
+        "id": data["id"],
+        "session_id": data["session_id"],
+        "message": message,
+        "created_at": data["created_at"] or datetime.utcnow().isoformat()
+    }
+    await manager.deliver_local(user_id, json.dumps(response_data))
+
+
+if COMMUNICATION_PUSH == "trigger":
+    listener.subscribe(COMMUNICATION_CHANNEL, push_inserted_communication)
+
+
 @app.get(ANSWER_ENDPOINT)
-async def add_response(session_id: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.session_id == session_id).first()
-    if not user:
+async def add_response(session_id: str, db: AsyncSession = Depends(get_async_db)):
+    record = await session_cache.get_session(db, session_id)
+    if not record:
         raise HTTPException(status_code=404, detail="User with the specified session_id not found")
 
-    last_communication = db.query(Communication).filter(Communication.session_id == session_id).order_by(Communication.id.desc()).first()
+    if COMMUNICATION_PUSH == "trigger":
+        # Already pushed by push_inserted_communication when n8n inserted the row
+        return {"status": "notification sent"}
+
+    result = await db.execute(
+        select(Communication).where(Communication.session_id == session_id).order_by(Communication.id.desc()).limit(1)
+    )
+    last_communication = result.scalars().first()
 
     if not last_communication:
         return {"status": "no new message to send"}
@@ -140,27 +288,22 @@ async def add_response(session_id: str, db: Session = Depends(get_db)):
         "created_at": created_at_iso
     }
 
-    asyncio.create_task(manager.send_personal_message(json.dumps(response_data), user.id))
+    asyncio.create_task(manager.send_personal_message(json.dumps(response_data), record.user_id))
 
     return {"status": "notification sent"}
 
 
 @app.get(PRODUCTS_ENDPOINT)
-async def get_products(session_id: str, db: Session = Depends(get_db)):
-    user = db.query(User).options(joinedload(User.client)).filter(User.session_id == session_id).first()
-
-    if not user or not user.client:
-        raise HTTPException(status_code=404, detail="User or associated client with the specified session_id not found")
-
-    client = user.client
+async def get_products(session_id: str, db: AsyncSession = Depends(get_async_db)):
+    client = await resolve_client(db, session_id)
 
     if client.product_api:
         products_url = client.product_api
         try:
-            async with httpx.AsyncClient() as http_client:
-                response = await http_client.get(products_url)
-                response.raise_for_status()
-                return response.json()
+            content = await product_cache.get(
+                client.id, products_url, http_clients.products, timeout=http_clients.products_timeout
+            )
+            return Response(content=content, media_type="application/json")
         except (httpx.RequestError, httpx.HTTPStatusError) as exc:
             print(f"Error fetching products from {products_url}: {exc}")
             raise HTTPException(
@@ -177,44 +320,111 @@ async def get_products(session_id: str, db: Session = Depends(get_db)):
     raise HTTPException(status_code=404, detail="No product list has been defined for this client.")
 
 
-@app.get(RULES_ENDPOINT)
-async def get_rules(session_id: str, db: Session = Depends(get_db)):
-    user = db.query(User).options(joinedload(User.client)).filter(User.session_id == session_id).first()
-
-    if not user or not user.client:
-        raise HTTPException(status_code=404, detail="User or associated client with the specified session_id not found")
+@app.get(f"{PRODUCTS_ENDPOINT}/cache")
+async def get_product_cache_stats():
+    return product_cache.stats()
 
-    client = user.client
 
-    attributes_with_templates = db.query(
-        Template.description,
-        Attribute.value
-    ).join(
-        Attribute, Template.id == Attribute.template_id
-    ).filter(
-        Attribute.client_id == client.id
-    ).all()
+@app.get(RULES_ENDPOINT)
+async def get_rules(session_id: str, db: AsyncSession = Depends(get_async_db)):
+    client = await resolve_client(db, session_id)
 
-    return {description: value for description, value in attributes_with_templates}
+    content = await rules_cache.get(db, client.id)
+    return Response(content=content, media_type="application/json")
 
 
 @app.get(CLIENT_ENDPOINT)
-async def get_client_data(session_id: str, db: Session = Depends(get_db)):
-    user = db.query(User).options(joinedload(User.client)).filter(User.session_id == session_id).first()
-
-    if not user or not user.client:
-        raise HTTPException(status_code=404, detail="User or associated client with the specified session_id not found")
+async def get_client_data(session_id: str, db: AsyncSession = Depends(get_async_db)):
+    client = await resolve_client(db, session_id)
+
+    return {"description": client.description}
+
+
+@app.get("/outbox/stats")
+async def get_outbox_stats(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(WebhookOutbox.status, func.count()).group_by(WebhookOutbox.status)
+    )
+    return {"dispatcher": dispatcher.stats(), "rows": {status: count for status, count in result.all()}}
+
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    settings = await settings_cache.aget()
+    return admission.stats(settings.values)
+
+
+@app.get("/sessions/cache")
+async def get_session_cache_stats():
+    return session_cache.stats()
+
+async def load_replay(user_id: int, last_seen_id: int):
+    """
+    Returns the session's rows after last_seen_id (a range scan on
+    ix_communication_session_id_id), at most WS_REPLAY_LIMIT of them. When
+    more were missed, the replay ends with a replay_truncated frame whose
+    next_id the client reconnects with to fetch the rest.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User.session_id).where(User.id == user_id))
+        session_id = result.scalar_one_or_none()
+        if not session_id:
+            return [], None, False
+        result = await db.execute(
+            select(Communication.id, Communication.session_id, Communication.message, Communication.created_at)
+            .where(Communication.session_id == session_id, Communication.id > last_seen_id)
+            .order_by(Communication.id)
+            .limit(WS_REPLAY_LIMIT + 1)
+        )
+        rows = result.all()
+
+    # The extra row only tells whether more were missed than one replay carries
+    truncated = len(rows) > WS_REPLAY_LIMIT
+    rows = rows[:WS_REPLAY_LIMIT]
+
+    replay = [
+        json.dumps({
+            "id": row.id,
+            "session_id": row.session_id,
+            "message": row.message,
+            "created_at": row.created_at.isoformat() if row.created_at else datetime.utcnow().isoformat()
+        })
+        for row in rows
+    ]
+    if truncated:
+        replay.append(json.dumps({"type": "replay_truncated", "next_id": rows[-1].id}))
+    return replay, rows[-1].id if rows else None, truncated
 
-    return {"description": user.client.description}
 
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
-    await manager.connect(user_id, websocket)
+async def websocket_endpoint(websocket: WebSocket, user_id: int, last_seen_id: Optional[int] = None):
+    # With last_seen_id, live delivery is held until the missed rows have been replayed
+    connection = await manager.connect(user_id, websocket, paused=last_seen_id is not None)
+    if last_seen_id is not None:
+        replay, last_replayed_id, truncated = [], None, False
+        try:
+            replay, last_replayed_id, truncated = await load_replay(user_id, last_seen_id)
+        except Exception as e:
+            print(f"Error replaying communications for user {user_id}: {e}")
+        connection.resume(replay, last_replayed_id, truncated)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        pass
+    finally:
+        manager.disconnect(user_id, connection)
+        await connection.close()
+
+
+@app.get("/ws/stats")
+async def get_websocket_stats():
+    return manager.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return metrics_response()
 
 
 if __name__ == "__main__":
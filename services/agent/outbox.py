@@ -0,0 +1,287 @@
+import asyncio
+import random
+import sys
+import os
+import time
+from collections import namedtuple
+from datetime import timedelta
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import select, update, delete, func
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.models import WebhookOutbox
+from shared.metrics import Counter, Histogram, register
+
+WEBHOOK_DISPATCH_DURATION = register(Histogram(
+    "webhook_dispatch_duration_seconds", "Latency of n8n webhook calls by outcome.", ("outcome",)
+))
+WEBHOOK_DISPATCH_ERRORS = register(Counter(
+    "webhook_dispatch_errors_total", "Failed n8n webhook calls by result (retry or dead).", ("result",)
+))
+
+
+ClaimedRow = namedtuple("ClaimedRow", ["id", "session_id", "payload", "attempts"])
+
+
+def enqueue(db, session_id: str, payload: dict) -> WebhookOutbox:
+    """Adds a webhook call to the outbox; it is persisted with the caller's transaction."""
+    entry = WebhookOutbox(session_id=session_id, payload=payload)
+    db.add(entry)
+    return entry
+
+
+async def enqueue_coalesced(db, session_id: str, payload: dict, window: float, max_batch: int) -> WebhookOutbox:
+    """
+    Adds a webhook call that waits `window` seconds for more prompts of the same session.
+
+    Every new prompt pushes the session's still-unsent rows back by another
+    window (debounce); once `max_batch` prompts are waiting they become due at
+    once. The dispatcher merges them into a single webhook call when claiming.
+    """
+    result = await db.execute(
+        update(WebhookOutbox)
+        .where(
+            WebhookOutbox.session_id == session_id,
+            WebhookOutbox.status == 'pending',
+            WebhookOutbox.attempts == 0,
+        )
+        .values(next_attempt_at=func.now() + timedelta(seconds=window))
+        .returning(WebhookOutbox.id)
+    )
+    waiting = [row_id for (row_id,) in result.all()]
+
+    if len(waiting) + 1 >= max_batch:
+        await db.execute(
+            update(WebhookOutbox).where(WebhookOutbox.id.in_(waiting)).values(next_attempt_at=func.now())
+        )
+        due = func.now()
+    else:
+        due = func.now() + timedelta(seconds=window)
+
+    entry = WebhookOutbox(session_id=session_id, payload=payload, next_attempt_at=due)
+    db.add(entry)
+    return entry
+
+
+class OutboxDispatcher:
+    """
+    Delivers webhook_outbox rows with a bounded pool of workers.
+
+    Rows are claimed in batches with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    agent workers or replicas can share the table. Claiming pushes next_attempt_at
+    forward by `lease` seconds; if a worker dies mid-delivery the row becomes
+    claimable again once the lease expires. Successful rows are deleted, failed
+    ones are retried with exponential backoff and moved to the 'dead' status
+    after `max_attempts`.
+
+    With `coalesce_max_batch` > 1, pending rows of the same session claimed
+    together (or still waiting in their coalescing window) are merged into the
+    oldest one, joining their prompts, so n8n runs the agent once per burst.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        send: Callable[[str, dict], Awaitable[None]],
+        concurrency: int = 10,
+        batch_size: int = 20,
+        max_attempts: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        poll_interval: float = 2.0,
+        lease: float = 60.0,
+        coalesce_max_batch: int = 1,
+    ):
+        self.session_factory = session_factory
+        self.send = send
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.coalesce_max_batch = coalesce_max_batch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Event()
+        self._outstanding = 0
+        self._tasks: List[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self.merged = 0
+
+    def wake(self, delay: float = 0.0):
+        """Signals that new rows were committed (or become due after `delay`), so they are claimed without waiting for the next poll."""
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._wakeup.set)
+        else:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._claim_loop()))
+        for _ in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "outstanding": self._outstanding,
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dead": self.dead,
+            "merged": self.merged,
+        }
+
+    async def _claim_loop(self):
+        while True:
+            capacity = min(self.batch_size, self.concurrency * 2 - self._outstanding)
+            if capacity <= 0:
+                # Backpressure: wait for workers to free slots instead of piling up claims
+                self._slots.clear()
+                await self._slots.wait()
+                continue
+
+            try:
+                claimed = await self._claim(capacity)
+            except Exception as e:
+                print(f"Error claiming webhook outbox rows: {e}")
+                claimed = []
+
+            for row in claimed:
+                self._outstanding += 1
+                self._queue.put_nowait(row)
+
+            if len(claimed) < capacity:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _claim(self, limit: int) -> list:
+        async with self.session_factory() as db:
+            async with db.begin():
+                result = await db.execute(
+                    select(WebhookOutbox.id, WebhookOutbox.session_id, WebhookOutbox.payload, WebhookOutbox.attempts)
+                    .where(WebhookOutbox.status == 'pending', WebhookOutbox.next_attempt_at <= func.now())
+                    .order_by(WebhookOutbox.id)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = [ClaimedRow(*row) for row in result.all()]
+                if rows and self.coalesce_max_batch > 1:
+                    rows = await self._merge_sessions(db, rows)
+                if rows:
+                    await db.execute(
+                        update(WebhookOutbox)
+                        .where(WebhookOutbox.id.in_([row.id for row in rows]))
+                        .values(
+                            attempts=WebhookOutbox.attempts + 1,
+                            next_attempt_at=func.now() + timedelta(seconds=self.lease),
+                        )
+                    )
+        return rows
+
+    async def _merge_sessions(self, db, rows: List[ClaimedRow]) -> List[ClaimedRow]:
+        claimed_ids = [row.id for row in rows]
+        result = await db.execute(
+            select(WebhookOutbox.id, WebhookOutbox.session_id, WebhookOutbox.payload, WebhookOutbox.attempts)
+            .where(
+                WebhookOutbox.session_id.in_({row.session_id for row in rows}),
+                WebhookOutbox.status == 'pending',
+                # Same eligibility as the claim: rows leased by another claim are still being delivered
+                WebhookOutbox.next_attempt_at <= func.now(),
+                WebhookOutbox.id.notin_(claimed_ids),
+            )
+            .order_by(WebhookOutbox.id)
+            .with_for_update(skip_locked=True)
+        )
+        by_session = {}
+        for row in sorted(rows + [ClaimedRow(*sibling) for sibling in result.all()], key=lambda r: r.id):
+            by_session.setdefault(row.session_id, []).append(row)
+
+        merged_rows, absorbed_ids = [], []
+        for session_rows in by_session.values():
+            for start in range(0, len(session_rows), self.coalesce_max_batch):
+                batch = session_rows[start:start + self.coalesce_max_batch]
+                primary = batch[0]
+                if len(batch) == 1:
+                    merged_rows.append(primary)
+                    continue
+                payload = dict(primary.payload)
+                payload["prompt"] = "\n".join(row.payload["prompt"] for row in batch)
+                await db.execute(update(WebhookOutbox).where(WebhookOutbox.id == primary.id).values(payload=payload))
+                absorbed_ids.extend(row.id for row in batch[1:])
+                merged_rows.append(primary._replace(payload=payload))
+
+        if absorbed_ids:
+            await db.execute(delete(WebhookOutbox).where(WebhookOutbox.id.in_(absorbed_ids)))
+            self.merged += len(absorbed_ids)
+        return merged_rows
+
+    async def _worker(self):
+        while True:
+            row = await self._queue.get()
+            try:
+                await self._deliver(row)
+            finally:
+                self._outstanding -= 1
+                self._slots.set()
+                self._queue.task_done()
+
+    async def _deliver(self, row):
+        started = time.perf_counter()
+        try:
+            await self.send(row.session_id, row.payload)
+        except Exception as e:
+            WEBHOOK_DISPATCH_DURATION.observe(time.perf_counter() - started, "error")
+            await self._record_failure(row, e)
+            return
+        WEBHOOK_DISPATCH_DURATION.observe(time.perf_counter() - started, "success")
+
+        self.sent += 1
+        try:
+            async with self.session_factory() as db:
+                async with db.begin():
+                    await db.execute(delete(WebhookOutbox).where(WebhookOutbox.id == row.id))
+        except Exception as e:
+            # The lease will expire and the row be sent again; n8n must tolerate duplicates anyway
+            print(f"Error removing delivered webhook outbox row {row.id}: {e}")
+
+    async def _record_failure(self, row, error: Exception):
+        attempts = row.attempts + 1
+        if attempts >= self.max_attempts:
+            self.dead += 1
+            WEBHOOK_DISPATCH_ERRORS.inc("dead")
+            values = {"status": 'dead', "last_error": str(error)}
+            print(f"Webhook for session {row.session_id} moved to dead letter after {attempts} attempts: {error}")
+        else:
+            self.failed += 1
+            WEBHOOK_DISPATCH_ERRORS.inc("retry")
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            delay += random.uniform(0, delay / 2)
+            values = {
+                "last_error": str(error),
+                "next_attempt_at": func.now() + timedelta(seconds=delay),
+            }
+            print(f"Error calling n8n webhook for session {row.session_id} (attempt {attempts}): {error}")
+
+        try:
+            async with self.session_factory() as db:
+                async with db.begin():
+                    await db.execute(update(WebhookOutbox).where(WebhookOutbox.id == row.id).values(**values))
+        except Exception as e:
+            print(f"Error recording webhook outbox failure for row {row.id}: {e}")
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+
+@dataclass
+class CatalogEntry:
+    url: str
+    content: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+class ProductCache:
+    """
+    Per-client cache of the product catalog returned by Client.product_api.
+
+    - Fresh entries (younger than ttl) are served from memory.
+    - Stale entries (younger than ttl + stale_ttl) are served immediately while a
+      background refresh revalidates them with If-None-Match / If-Modified-Since.
+    - Concurrent refreshes for the same client share a single upstream request.
+
+    The catalog is kept as the raw JSON bytes returned upstream, so a hit is
+    served without re-serializing it.
+    """
+
+    def __init__(self, ttl: float = 60.0, stale_ttl: float = 300.0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries: Dict[int, CatalogEntry] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    async def get(self, client_id: int, url: str, http_client: httpx.AsyncClient, timeout=None) -> bytes:
+        entry = self.entries.get(client_id)
+        if entry is not None and entry.url == url:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return entry.content
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if client_id not in self._inflight:
+                    task = self._start_refresh(client_id, url, http_client, timeout)
+                    task.add_done_callback(self._log_background_error)
+                return entry.content
+
+        self.misses += 1
+        inflight = self._inflight.get(client_id)
+        if inflight is None:
+            inflight = self._start_refresh(client_id, url, http_client, timeout)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(inflight)
+
+    def invalidate(self, client_id: Optional[int] = None):
+        if client_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(client_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "coalesced": self.coalesced,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+        }
+
+    def _start_refresh(self, client_id: int, url: str, http_client: httpx.AsyncClient, timeout) -> asyncio.Future:
+        task = asyncio.ensure_future(self._fetch(client_id, url, http_client, timeout))
+        self._inflight[client_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(client_id, None))
+        return task
+
+    async def _fetch(self, client_id: int, url: str, http_client: httpx.AsyncClient, timeout) -> bytes:
+        entry = self.entries.get(client_id)
+        if entry is not None and entry.url != url:
+            entry = None
+
+        headers = {}
+        if entry is not None:
+            self.revalidations += 1
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            response = await http_client.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and entry is not None:
+                self.not_modified += 1
+                entry.fetched_at = time.monotonic()
+                return entry.content
+
+            response.raise_for_status()
+            # Validate once on fetch; hits are served from the raw bytes
+            json.loads(response.content)
+        except Exception:
+            self.errors += 1
+            raise
+
+        self.entries[client_id] = CatalogEntry(
+            url=url,
+            content=response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.monotonic(),
+        )
+        return response.content
+
+    @staticmethod
+    def _log_background_error(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error refreshing product catalog in background: {task.exception()}")
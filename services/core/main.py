@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 import sys
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,11 +12,31 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from shared.database import engine
 from shared.models import Base
+from shared.metrics import MetricsMiddleware, instrument_pool, metrics_response
+from shared.query_stats import QueryStatsMiddleware, instrument_engine
+from shared.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from shared.history import NEXT_BEFORE_ID_HEADER
+from shared.partitions import ensure_partitions
 from routers import clients, users, settings, templates, attributes, communications, statistics
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Core Service")
+instrument_pool(engine, "sync")
+instrument_engine(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Safety net for the partition maintenance cron: never start without next months' partitions
+    try:
+        with engine.begin() as conn:
+            ensure_partitions(conn)
+    except Exception as e:
+        print(f"Error creating communication partitions: {e}")
+    yield
+
+
+app = FastAPI(title="Core Service", lifespan=lifespan)
 
 FRONTEND_PORT = os.getenv("FRONTEND_PORT", "3000")
 origins = [
@@ -29,7 +50,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, NEXT_BEFORE_ID_HEADER],
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(clients.router, prefix="/api", tags=["Clients"])
 app.include_router(users.router, prefix="/api", tags=["Users"])
@@ -39,6 +63,11 @@ app.include_router(attributes.router, prefix="/api", tags=["Client Attributes"])
 app.include_router(communications.router, prefix="/api/communications", tags=["Communications"])
 app.include_router(statistics.router, prefix="/api", tags=["Statistics"])
 
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return metrics_response()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("CORE_PORT", "8000"))
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
@@ -9,7 +11,10 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from shared.database import get_db
+from shared.pagination import PageParams, paginate
 from shared.models import Attribute, Template, Client
+from shared.rules import rebuild_client_rules, rebuild_many_client_rules
+from shared.attributes import upsert_attributes, delete_attributes
 
 router = APIRouter()
 
@@ -25,6 +30,19 @@ class AttributeCreate(AttributeBase):
 class AttributeUpdate(BaseModel):
     value: str
 
+class AttributeBulkItem(BaseModel):
+    client_id: int
+    template_id: int
+    value: Optional[str] = None  # null or empty deletes the attribute
+
+class AttributeBulkRequest(BaseModel):
+    items: List[AttributeBulkItem]
+
+class AttributeBulkResponse(BaseModel):
+    written: int
+    deleted: int
+    clients: int
+
 class AttributeResponse(AttributeBase):
     id: int
     updated_at: datetime
@@ -62,8 +80,19 @@ def enrich_attribute_response(attribute: Attribute) -> AttributeResponse:
 # CRUD Endpoints
 
 @router.get("/attributes", response_model=List[AttributeResponse])
-def get_all_attributes(db: Session = Depends(get_db)):
-    attributes = db.query(Attribute).options(joinedload(Attribute.client), joinedload(Attribute.template)).all()
+def get_all_attributes(
+    response: Response,
+    client_id: Optional[int] = None,
+    template_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+):
+    query = db.query(Attribute).options(joinedload(Attribute.client), joinedload(Attribute.template))
+    if client_id is not None:
+        query = query.filter(Attribute.client_id == client_id)
+    if template_id is not None:
+        query = query.filter(Attribute.template_id == template_id)
+    attributes = paginate(query, Attribute.id, response, page)
     return [enrich_attribute_response(attr) for attr in attributes]
 
 @router.get("/attributes/{attribute_id}", response_model=AttributeResponse)
@@ -80,29 +109,48 @@ def get_client_attributes(client_id: int, db: Session = Depends(get_db)):
 
 @router.post("/attributes", response_model=AttributeResponse, status_code=201)
 def create_attribute(attribute_data: AttributeCreate, db: Session = Depends(get_db)):
-    # Validate client_id and template_id
-    client = db.query(Client).filter(Client.id == attribute_data.client_id).first()
-    if not client:
-        raise HTTPException(status_code=400, detail="Client not found for the given client_id")
-    template = db.query(Template).filter(Template.id == attribute_data.template_id).first()
-    if not template:
-        raise HTTPException(status_code=400, detail="Template not found for the given template_id")
-
-    # Check if attribute for this client and template already exists
-    existing_attribute = db.query(Attribute).filter(
-        Attribute.client_id == attribute_data.client_id,
-        Attribute.template_id == attribute_data.template_id
-    ).first()
-
-    if existing_attribute:
+    # The unique (client_id, template_id) constraint and the foreign keys do the validation in one statement
+    stmt = insert(Attribute).values(**attribute_data.model_dump(), updated_at=datetime.utcnow())
+    stmt = stmt.on_conflict_do_nothing(index_elements=[Attribute.client_id, Attribute.template_id])
+    try:
+        attribute_id = db.execute(stmt.returning(Attribute.id)).scalar_one_or_none()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Client or template not found for the given client_id and template_id")
+    if attribute_id is None:
         raise HTTPException(status_code=400, detail="Attribute for this client and template already exists. Use PUT to update.")
 
-    db_attribute = Attribute(**attribute_data.model_dump())
-    db.add(db_attribute)
+    rebuild_client_rules(db, [attribute_data.client_id])
     db.commit()
-    db.refresh(db_attribute) # Refresh to load relationships
+    db_attribute = db.query(Attribute).options(joinedload(Attribute.client), joinedload(Attribute.template)).filter(Attribute.id == attribute_id).one()
     return enrich_attribute_response(db_attribute)
 
+@router.post("/attributes/bulk", response_model=AttributeBulkResponse)
+def bulk_write_attributes(request: AttributeBulkRequest, db: Session = Depends(get_db)):
+    """
+    Upserts or deletes many (client_id, template_id, value) triples, across
+    any number of clients, in one transaction: e.g. rolling out a new template
+    to every tenant. Items with a null or empty value delete the attribute;
+    when a pair repeats, its last item wins.
+    """
+    client_ids = {item.client_id for item in request.items}
+    template_ids = {item.template_id for item in request.items}
+    known_clients = {cid for (cid,) in db.query(Client.id).filter(Client.id.in_(client_ids))} if client_ids else set()
+    known_templates = {tid for (tid,) in db.query(Template.id).filter(Template.id.in_(template_ids))} if template_ids else set()
+    if client_ids - known_clients or template_ids - known_templates:
+        raise HTTPException(status_code=400, detail={
+            "unknown_client_ids": sorted(client_ids - known_clients),
+            "unknown_template_ids": sorted(template_ids - known_templates),
+        })
+
+    # The last item of a (client, template) pair wins, whether it sets or deletes the value
+    latest = {(item.client_id, item.template_id): item.value for item in request.items}
+    written = upsert_attributes(db, [(cid, tid, value) for (cid, tid), value in latest.items() if value])
+    deleted = delete_attributes(db, [pair for pair, value in latest.items() if not value])
+    rebuild_many_client_rules(db, client_ids)
+    db.commit()
+    return AttributeBulkResponse(written=written, deleted=deleted, clients=len(client_ids))
+
 @router.put("/attributes/{attribute_id}", response_model=AttributeResponse)
 def update_attribute(attribute_id: int, attribute_data: AttributeUpdate, db: Session = Depends(get_db)):
     db_attribute = db.query(Attribute).options(joinedload(Attribute.client), joinedload(Attribute.template)).filter(Attribute.id == attribute_id).first()
@@ -112,6 +160,8 @@ def update_attribute(attribute_id: int, attribute_data: AttributeUpdate, db: Ses
     # The UI only allows updating the value
     db_attribute.value = attribute_data.value
 
+    db.flush()
+    rebuild_client_rules(db, [db_attribute.client_id])
     db.commit()
     db.refresh(db_attribute)
     return enrich_attribute_response(db_attribute)
@@ -123,4 +173,6 @@ def delete_attribute(attribute_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Attribute not found")
 
     db.delete(db_attribute)
+    db.flush()
+    rebuild_client_rules(db, [db_attribute.client_id])
     db.commit()
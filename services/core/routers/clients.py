@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
 from datetime import datetime
+import tempfile
 import sys
 import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from shared.database import get_db
+from shared.pagination import PageParams, paginate
 from shared.models import Client, Attribute, Template
+from shared.rules import rebuild_client_rules
+from shared.attributes import upsert_attributes, delete_attributes
+from shared.notify import notify
+from shared.session_cache import CLIENT_CHANNEL
+from shared.onboarding import import_clients, detect_format, SPOOL_BYTES, MAX_IMPORT_BYTES
 
 router = APIRouter()
 
@@ -53,10 +61,66 @@ class AttributeResponse(BaseModel):
     template_key: str
     value: str
 
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    rows: int
+    clients_created: int
+    clients_updated: int
+    attributes_created: int
+    attributes_updated: int
+    error_count: int
+    errors: List[ImportRowError]
+    dry_run: bool
+
+
 @router.get("/clients", response_model=List[ClientResponse])
-def get_clients(db: Session = Depends(get_db)):
-    clients = db.query(Client).all()
-    return clients
+def get_clients(response: Response, status: Optional[str] = None, page: PageParams = Depends(),
+                db: Session = Depends(get_db)):
+    query = db.query(Client)
+    if status:
+        query = query.filter(Client.status == status)
+    return paginate(query, Client.id, response, page)
+
+
+@router.post("/clients/import", response_model=ImportReport)
+async def import_clients_file(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    mode: str = Query("upsert", pattern="^(upsert|insert)$"),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Bulk onboarding: the request body is a CSV or JSONL file of clients and
+    their attributes (see shared/onboarding.py). Invalid rows are skipped and
+    reported by line; `mode=insert` rejects existing client codes instead of
+    updating them and `dry_run` only validates. Bodies over IMPORT_MAX_BYTES
+    are rejected with 413.
+    """
+    too_large = HTTPException(status_code=413, detail=f"Upload exceeds the limit of {MAX_IMPORT_BYTES} bytes")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_IMPORT_BYTES:
+        raise too_large
+
+    upload = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_IMPORT_BYTES:
+                raise too_large
+            # Once spooled to disk the writes block, so keep them off the event loop
+            await run_in_threadpool(upload.write, chunk)
+        upload.seek(0)
+        fmt = format or detect_format(content_type=request.headers.get("content-type", ""))
+        return await run_in_threadpool(import_clients, db, upload, fmt, mode, dry_run)
+    finally:
+        await run_in_threadpool(upload.close)
 
 
 @router.get("/clients/{client_id}", response_model=ClientResponse)
@@ -103,6 +167,8 @@ def create_client(client_data: ClientCreate, db: Session = Depends(get_db)):
                     attribute = Attribute(client_id=db_client.id, template_id=template.id, value=value)
                     db.add(attribute)
 
+    db.flush()
+    rebuild_client_rules(db, [db_client.id])
     db.commit()  # Single commit for client and all attributes
     db.refresh(db_client)
 
@@ -131,31 +197,15 @@ def update_client(client_id: int, client_data: ClientUpdate, db: Session = Depen
         templates = db.query(Template).filter(Template.key.in_(template_keys)).all()
         templates_map = {template.key: template for template in templates}
 
-        # 2. Fetch all existing attributes for this client at once
-        template_ids = [t.id for t in templates]
-        existing_attributes = db.query(Attribute).filter(
-            Attribute.client_id == client_id,
-            Attribute.template_id.in_(template_ids)
-        ).all()
-        existing_attributes_map = {attr.template_id: attr for attr in existing_attributes}
-
-        # 3. Process updates
-        for template_key, new_value in client_data.attributes.items():
-            template = templates_map.get(template_key)
-            if not template:
-                continue
-
-            existing_attr = existing_attributes_map.get(template.id)
-
-            if existing_attr:
-                if new_value:
-                    existing_attr.value = new_value
-                else:
-                    db.delete(existing_attr)
-            elif new_value:
-                new_attribute = Attribute(client_id=client_id, template_id=template.id, value=new_value)
-                db.add(new_attribute)
+        # 2. Upsert the new values and delete the emptied ones, one statement each
+        values = [(templates_map[key].id, value) for key, value in client_data.attributes.items() if key in templates_map]
+        upsert_attributes(db, [(client_id, template_id, value) for template_id, value in values if value])
+        delete_attributes(db, [(client_id, template_id) for template_id, value in values if not value])
+
+        db.flush()
+        rebuild_client_rules(db, [client_id])
 
+    notify(db, CLIENT_CHANNEL, str(client_id))
     db.commit()  # Single commit for all changes
     db.refresh(db_client)
     return db_client
@@ -168,6 +218,7 @@ def update_client_status(client_code: str, status_update: StatusUpdate, db: Sess
         raise HTTPException(status_code=404, detail="Client not found")
 
     db_client.status = status_update.status
+    notify(db, CLIENT_CHANNEL, str(db_client.id))
     db.commit()
     db.refresh(db_client)
     return db_client
@@ -180,6 +231,7 @@ def delete_client(client_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Client not found")
 
     db.delete(db_client)
+    notify(db, CLIENT_CHANNEL, str(client_id))
     db.commit()
     return {"ok": True}
 
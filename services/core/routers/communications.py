@@ -1,24 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, cast, Text
 from sqlalchemy.orm import Session
-from typing import List, Any
+from typing import List, Any, Optional
 from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+import json
 import sys
 import os
+import zlib
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
-from shared.database import get_db
-from shared.models import Communication
+from shared.database import get_db, engine
+from shared.models import Communication, User
+from shared.history import load_history, MAX_HISTORY_PAGE_SIZE, NEXT_BEFORE_ID_HEADER
 
 router = APIRouter()
 
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
 class CommunicationResponse(BaseModel):
     id: int
     session_id: str
     message: Any
     model_config = ConfigDict(from_attributes=True)
 
+def export_rows(client_id: Optional[int], since: Optional[datetime], until: Optional[datetime], after_id: Optional[int]):
+    """
+    Yields NDJSON chunks of one batch each, read through a server-side cursor.
+
+    The message is fetched as JSONB text and spliced into the line as is, so
+    rows are never decoded to Python objects and memory stays at one batch.
+    """
+    query = (
+        select(
+            Communication.id, Communication.session_id, User.id, User.username, User.client_id,
+            Communication.created_at, cast(Communication.message, Text),
+        )
+        .join(User, User.session_id == Communication.session_id)
+        .order_by(Communication.id)
+    )
+    if client_id is not None:
+        query = query.where(User.client_id == client_id)
+    if since is not None:
+        query = query.where(Communication.created_at >= since)
+    if until is not None:
+        query = query.where(Communication.created_at < until)
+    if after_id is not None:
+        query = query.where(Communication.id > after_id)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(query)
+        for batch in result.partitions():
+            lines = []
+            for comm_id, session_id, user_id, username, row_client_id, created_at, message in batch:
+                head = json.dumps({
+                    "id": comm_id,
+                    "session_id": session_id,
+                    "user_id": user_id,
+                    "username": username,
+                    "client_id": row_client_id,
+                    "created_at": created_at.isoformat() if created_at else None,
+                })
+                lines.append(f'{head[:-1]}, "message": {message}}}\n')
+            yield "".join(lines).encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Declared before /{session_id} so "export" is not taken as a session id
+@router.get("/export")
+def export_communications(
+    client_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|gzip)$"),
+):
+    """
+    Streams communication rows as NDJSON (or gzipped NDJSON), ordered by id.
+
+    An interrupted export can be resumed with after_id set to the last id received.
+    """
+    chunks = export_rows(client_id, since, until, after_id)
+    filename = f"communications-{datetime.utcnow():%Y%m%dT%H%M%S}.ndjson"
+    if format == "gzip":
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'},
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/{session_id}", response_model=List[CommunicationResponse])
-def get_communications_by_session(session_id: str, db: Session = Depends(get_db)):
-    communications = db.query(Communication).filter(Communication.session_id == session_id).order_by(Communication.id).all()
+def get_communications_by_session(
+    session_id: str,
+    response: Response,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    communications, next_before_id = load_history(db, session_id, before_id, limit)
+    if next_before_id is not None:
+        response.headers[NEXT_BEFORE_ID_HEADER] = str(next_before_id)
     return communications
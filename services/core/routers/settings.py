@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -9,7 +9,10 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from shared.database import get_db
+from shared.pagination import PageParams, paginate, starts_with
 from shared.models import Setting
+from shared.notify import notify
+from shared.settings_cache import SETTINGS_CHANNEL
 
 router = APIRouter()
 
@@ -37,9 +40,12 @@ class SettingResponse(SettingBase):
 # CRUD Endpoints
 
 @router.get("/settings", response_model=List[SettingResponse])
-def get_all_settings(db: Session = Depends(get_db)):
-    settings = db.query(Setting).all()
-    return settings
+def get_all_settings(response: Response, key_prefix: Optional[str] = None, page: PageParams = Depends(),
+                     db: Session = Depends(get_db)):
+    query = db.query(Setting)
+    if key_prefix:
+        query = query.filter(starts_with(Setting.key, key_prefix))
+    return paginate(query, Setting.id, response, page)
 
 @router.get("/settings/{setting_id}", response_model=SettingResponse)
 def get_setting_by_id(setting_id: int, db: Session = Depends(get_db)):
@@ -56,6 +62,7 @@ def create_setting(setting_data: SettingCreate, db: Session = Depends(get_db)):
 
     db_setting = Setting(**setting_data.model_dump()) # Use .model_dump() for Pydantic v2
     db.add(db_setting)
+    notify(db, SETTINGS_CHANNEL, db_setting.key)
     db.commit()
     db.refresh(db_setting)
     return db_setting
@@ -70,6 +77,7 @@ def update_setting(setting_id: int, setting_data: SettingUpdate, db: Session = D
     for key, value in update_data.items():
         setattr(db_setting, key, value)
 
+    notify(db, SETTINGS_CHANNEL, db_setting.key)
     db.commit()
     db.refresh(db_setting)
     return db_setting
@@ -81,5 +89,6 @@ def delete_setting(setting_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Setting not found")
 
     db.delete(db_setting)
+    notify(db, SETTINGS_CHANNEL, db_setting.key)
     db.commit()
     return {"ok": True}
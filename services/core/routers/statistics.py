@@ -1,32 +1,209 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime
+from sqlalchemy import func, cast, Date
+from datetime import date, datetime, timedelta
+from typing import Optional
+from collections import defaultdict
+import threading
+import time
 import sys
 import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from shared.database import get_db
-from shared.models import Communication
+from shared.models import CommunicationDailyStats, CommunicationSessionDay, Client
 
 router = APIRouter()
 
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "60"))
+STATS_CACHE_SIZE = 256
+MAX_BUCKETS = 1000
+
+
+class ResultCache:
+    """Short-lived cache of statistics results, keyed by the query parameters."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        value = compute()
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.maxsize:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+
+stats_cache = ResultCache(STATS_CACHE_TTL, STATS_CACHE_SIZE)
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def periods(start: date, end: date, granularity: str) -> list:
+    result, current = [], period_start(start, granularity)
+    while current < end:
+        result.append(current)
+        current = next_period(current, granularity)
+    return result
+
+
+def aggregate(db: Session, start: date, end: date, granularity: str, client_id: Optional[int], per_client: bool) -> dict:
+    """
+    Aggregates the daily rollups into periods, keyed by (period,) or (period, client_id).
+
+    Both rollup tables are filtered with `day >= start AND day < end`, a range
+    their primary keys serve directly; no query touches `communication`.
+    """
+    values = defaultdict(lambda: {"messages": 0, "sessions": 0})
+
+    period = cast(func.date_trunc(granularity, CommunicationDailyStats.day), Date)
+    keys = [period, CommunicationDailyStats.client_id] if per_client else [period]
+    query = db.query(*keys, func.sum(CommunicationDailyStats.messages)).filter(
+        CommunicationDailyStats.day >= start, CommunicationDailyStats.day < end
+    )
+    if client_id is not None:
+        query = query.filter(CommunicationDailyStats.client_id == client_id)
+    for *key, messages in query.group_by(*keys):
+        values[tuple(key)]["messages"] = int(messages)
+
+    # Distinct counts cannot be summed from daily figures, so they come from the session-day rows
+    period = cast(func.date_trunc(granularity, CommunicationSessionDay.day), Date)
+    keys = [period, CommunicationSessionDay.client_id] if per_client else [period]
+    query = db.query(*keys, func.count(func.distinct(CommunicationSessionDay.session_id))).filter(
+        CommunicationSessionDay.day >= start, CommunicationSessionDay.day < end
+    )
+    if client_id is not None:
+        query = query.filter(CommunicationSessionDay.client_id == client_id)
+    for *key, sessions in query.group_by(*keys):
+        values[tuple(key)]["sessions"] = sessions
+
+    return values
+
+
+def active_users(db: Session, start: date, end: date, client_id: Optional[int], per_client: bool) -> dict:
+    """
+    Distinct users with messages anywhere in [start, end), keyed by () or
+    (client_id,). Each user has one session, so this is the distinct session
+    count over the whole range; unlike the per-period figures it does not
+    count a user again in every period they were active.
+    """
+    keys = [CommunicationSessionDay.client_id] if per_client else []
+    query = db.query(*keys, func.count(func.distinct(CommunicationSessionDay.session_id))).filter(
+        CommunicationSessionDay.day >= start, CommunicationSessionDay.day < end
+    )
+    if client_id is not None:
+        query = query.filter(CommunicationSessionDay.client_id == client_id)
+    if per_client:
+        query = query.group_by(*keys)
+    return {tuple(key): count for *key, count in query}
+
+
+def compute_stats(db: Session, start: date, end: date, granularity: str, client_id: Optional[int], by_client: bool):
+    empty = {"messages": 0, "sessions": 0}
+    buckets = periods(start, end, granularity)
+
+    totals = aggregate(db, start, end, granularity, client_id, per_client=False)
+    response_data = {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "active_users": active_users(db, start, end, client_id, per_client=False).get((), 0),
+        "data": [{"period": p, **totals.get((p,), empty)} for p in buckets],
+    }
+
+    if by_client:
+        per_client = aggregate(db, start, end, granularity, client_id, per_client=True)
+        users_per_client = active_users(db, start, end, client_id, per_client=True)
+        client_ids = sorted({cid for _, cid in per_client})
+        codes = dict(db.query(Client.id, Client.client_code).filter(Client.id.in_(client_ids)).all()) if client_ids else {}
+        response_data["clients"] = [
+            {
+                "client_id": cid,
+                "client_code": codes.get(cid),
+                "active_users": users_per_client.get((cid,), 0),
+                "data": [{"period": p, **per_client.get((p, cid), empty)} for p in buckets],
+            }
+            for cid in client_ids
+        ]
+
+    return response_data
+
+
+@router.get("/statistics/communications", tags=["Statistics"])
+def get_communication_stats(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    client_id: Optional[int] = None,
+    by_client: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Messages and distinct sessions per day, week or month in [start, end),
+    plus the distinct active users over the whole range, optionally for one
+    client or broken down per client. Defaults to the last 30 days.
+    """
+    end = end or datetime.utcnow().date() + timedelta(days=1)
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if len(periods(start, end, granularity)) > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"The range spans more than {MAX_BUCKETS} periods; use a coarser granularity")
+
+    key = ("range", start, end, granularity, client_id, by_client)
+    return stats_cache.get_or_compute(key, lambda: compute_stats(db, start, end, granularity, client_id, by_client))
+
+
 @router.get("/statistics/communications/by-month", tags=["Statistics"])
 def get_communication_stats_by_month(db: Session = Depends(get_db)):
     """
     Calculates the number of unique communication sessions per month for the current year.
     """
     current_year = datetime.utcnow().year
+    return stats_cache.get_or_compute(("by-month", current_year), lambda: compute_by_month(db, current_year))
+
 
-    # Query to get the count of distinct session_ids per month for the current year
+def compute_by_month(db: Session, current_year: int):
+    month = func.extract('month', CommunicationSessionDay.day)
+
+    # Distinct sessions per month from the session-day rollup, with a plain range on its primary key
     stats = (
         db.query(
-            func.extract('month', Communication.created_at).label('month'),
-            func.count(func.distinct(Communication.session_id)).label('count')
+            month.label('month'),
+            func.count(func.distinct(CommunicationSessionDay.session_id)).label('count')
+        )
+        .filter(
+            CommunicationSessionDay.day >= date(current_year, 1, 1),
+            CommunicationSessionDay.day < date(current_year + 1, 1, 1),
         )
-        .filter(func.extract('year', Communication.created_at) == current_year)
-        .group_by(func.extract('month', Communication.created_at))
+        .group_by(month)
         .all()
     )
 
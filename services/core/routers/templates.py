@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -8,7 +8,9 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from shared.database import get_db
+from shared.pagination import PageParams, paginate
 from shared.models import Template
+from shared.rules import rebuild_many_client_rules, client_ids_for_template
 
 router = APIRouter()
 
@@ -41,9 +43,12 @@ class TemplateResponse(BaseModel):
 # CRUD Endpoints
 
 @router.get("/templates", response_model=List[TemplateResponse])
-def get_all_templates(db: Session = Depends(get_db)):
-    templates = db.query(Template).all()
-    return templates
+def get_all_templates(response: Response, status: Optional[str] = None, page: PageParams = Depends(),
+                      db: Session = Depends(get_db)):
+    query = db.query(Template)
+    if status:
+        query = query.filter(Template.status == status)
+    return paginate(query, Template.id, response, page)
 
 @router.get("/templates/{template_id}", response_model=TemplateResponse)
 def get_template_by_id(template_id: int, db: Session = Depends(get_db)):
@@ -70,6 +75,11 @@ def update_template(template_id: int, template_data: TemplateUpdate, db: Session
     for key, value in update_data.items():
         setattr(db_template, key, value)
 
+    # The description is the key of every rules document built from this template
+    if "description" in update_data:
+        db.flush()
+        rebuild_many_client_rules(db, client_ids_for_template(db, template_id))
+
     db.commit()
     db.refresh(db_template)
     return db_template
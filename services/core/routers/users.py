@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional, Any
@@ -11,7 +11,11 @@ import uuid
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from shared.database import get_db
-from shared.models import User, Client, Communication
+from shared.pagination import PageParams, paginate, starts_with
+from shared.history import load_history, MAX_HISTORY_PAGE_SIZE
+from shared.models import User, Client
+from shared.notify import notify
+from shared.session_cache import SESSION_CHANNEL
 
 router = APIRouter()
 
@@ -51,6 +55,8 @@ class UserSessionResponse(BaseModel):
     client_code: str
     client_name: str
     communications: List[CommunicationResponse] = []
+    # Pass as before_id to load older messages; None when the history is complete
+    next_before_id: Optional[int] = None
     model_config = ConfigDict(from_attributes=True)
 
 def enrich_user_response(user: User) -> UserResponse:
@@ -69,7 +75,13 @@ def enrich_user_response(user: User) -> UserResponse:
 # --- Static routes first ---
 
 @router.get("/users/session", response_model=UserSessionResponse)
-def get_user_session(client_code: str, username: str, db: Session = Depends(get_db)):
+def get_user_session(
+    client_code: str,
+    username: str,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
     client = db.query(Client).filter(Client.client_code == client_code, Client.status == 'Activo').first()
     if not client:
         raise HTTPException(status_code=404, detail=f"Cliente con código '{client_code}' no encontrado o inactivo.")
@@ -90,7 +102,7 @@ def get_user_session(client_code: str, username: str, db: Session = Depends(get_
         db.commit()
         db.refresh(user)
         
-    communications = db.query(Communication).filter(Communication.session_id == user.session_id).order_by(Communication.created_at.asc()).all()
+    communications, next_before_id = load_history(db, user.session_id, before_id, limit)
 
     return UserSessionResponse(
         user_id=user.id,
@@ -99,21 +111,38 @@ def get_user_session(client_code: str, username: str, db: Session = Depends(get_
         client_id=user.client_id,
         client_code=client.client_code,
         client_name=client.name,
-        communications=communications
+        communications=communications,
+        next_before_id=next_before_id,
     )
 
 @router.get("/users", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db)):
-    users = db.query(User).options(joinedload(User.client)).all()
+def get_all_users(
+    response: Response,
+    client_id: Optional[int] = None,
+    status: Optional[str] = None,
+    username_prefix: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+):
+    query = db.query(User).options(joinedload(User.client))
+    if client_id is not None:
+        query = query.filter(User.client_id == client_id)
+    if status:
+        query = query.filter(User.status == status)
+    if username_prefix:
+        query = query.filter(starts_with(User.username, username_prefix))
+    users = paginate(query, User.id, response, page)
     return [enrich_user_response(user) for user in users]
 
 @router.get("/clients/{client_code}/users", response_model=List[UserResponse])
-def get_users_for_client(client_code: str, db: Session = Depends(get_db)):
+def get_users_for_client(client_code: str, response: Response, page: PageParams = Depends(),
+                         db: Session = Depends(get_db)):
     client = db.query(Client).filter(Client.client_code == client_code).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
-    users = db.query(User).options(joinedload(User.client)).filter(User.client_id == client.id).all()
+    query = db.query(User).options(joinedload(User.client)).filter(User.client_id == client.id)
+    users = paginate(query, User.id, response, page)
     return [enrich_user_response(user) for user in users]
 
 # --- Dynamic routes last ---
@@ -184,6 +213,8 @@ def update_user(user_id: int, user_data: UserUpdate, db: Session = Depends(get_d
     for key, value in update_data.items():
         setattr(db_user, key, value)
 
+    if db_user.session_id:
+        notify(db, SESSION_CHANNEL, db_user.session_id)
     db.commit()
     db.refresh(db_user)
     db_user = db.query(User).options(joinedload(User.client)).filter(User.id == db_user.id).first()
@@ -196,6 +227,8 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     
     try:
+        if db_user.session_id:
+            notify(db, SESSION_CHANNEL, db_user.session_id)
         db.delete(db_user)
         db.commit()
     except IntegrityError:
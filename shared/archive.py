@@ -0,0 +1,171 @@
+"""
+Cold storage for the conversation history of inactive sessions.
+
+The archival job moves the messages of sessions idle for longer than a
+configurable age out of `communication` into gzip JSONL segment files on
+local disk. Each archived session is written as its own gzip member, and the
+`communication_archive` table records its segment, byte offset and id range,
+so reading one session back decompresses only that session's bytes.
+
+A session that becomes active again simply gets new rows in `communication`;
+archiving it later appends another member. Archived ids are always lower
+than the live ones, which lets history reads continue into the archive once
+the live rows run out.
+
+    python -m shared.archive --older-than-days 365
+"""
+import argparse
+import gzip
+import json
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, delete, func, cast, Text
+from sqlalchemy.orm import Session
+
+from shared.database import SessionLocal
+from shared.models import Communication, CommunicationArchive, CommunicationSessionDay
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(__file__), '..', 'archive'))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_SEGMENT_BYTES = int(os.getenv("ARCHIVE_SEGMENT_BYTES", str(256 * 1024 * 1024)))
+
+ArchivedMessage = namedtuple("ArchivedMessage", ["id", "session_id", "message", "created_at"])
+
+
+def _segment_path(segment: str) -> str:
+    return os.path.join(ARCHIVE_DIR, segment)
+
+
+def read_session(db: Session, session_id: str, before_id: Optional[int] = None, limit: Optional[int] = None) -> List:
+    """Returns archived messages of a session with id < before_id, newest first, at most `limit` of them."""
+    query = select(CommunicationArchive).where(CommunicationArchive.session_id == session_id)
+    if before_id is not None:
+        query = query.where(CommunicationArchive.first_id < before_id)
+
+    messages = []
+    for entry in db.scalars(query.order_by(CommunicationArchive.last_id.desc())):
+        with open(_segment_path(entry.segment), "rb") as f:
+            f.seek(entry.offset)
+            data = gzip.decompress(f.read(entry.length))
+        chunk = []
+        for line in data.splitlines():
+            row = json.loads(line)
+            if before_id is None or row["id"] < before_id:
+                chunk.append(ArchivedMessage(row["id"], row["session_id"], row["message"],
+                                             datetime.fromisoformat(row["created_at"])))
+        messages.extend(reversed(chunk))
+        if limit is not None and len(messages) >= limit:
+            return messages[:limit]
+    return messages
+
+
+class SegmentWriter:
+    """Appends gzip members to the current segment file, starting a new one past ARCHIVE_SEGMENT_BYTES."""
+
+    def __init__(self):
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        self.segment = None
+        self.file = None
+
+    def _open(self):
+        if self.file is not None:
+            self.file.close()
+        self.segment = f"communication-{datetime.utcnow():%Y%m%dT%H%M%S%f}.jsonl.gz"
+        self.file = open(_segment_path(self.segment), "ab")
+
+    def write(self, data: bytes):
+        if self.file is None or self.file.tell() >= ARCHIVE_SEGMENT_BYTES:
+            self._open()
+        offset = self.file.tell()
+        self.file.write(data)
+        self.file.flush()
+        # The index row pointing here is committed afterwards, so the bytes must be on disk first
+        os.fsync(self.file.fileno())
+        return self.segment, offset
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def idle_sessions(db: Session, cutoff: datetime, limit: int) -> List[str]:
+    """Sessions with live messages and none since `cutoff`, read from the session-day rollup."""
+    last_day = func.max(CommunicationSessionDay.day)
+    recent = select(CommunicationSessionDay.session_id).group_by(CommunicationSessionDay.session_id).having(
+        last_day < cutoff.date()
+    )
+    live = select(Communication.session_id).where(Communication.session_id == CommunicationSessionDay.session_id)
+    return list(db.scalars(recent.where(live.exists()).limit(limit)))
+
+
+def archive_session(db: Session, writer: SegmentWriter, session_id: str) -> int:
+    rows = db.execute(
+        select(Communication.id, Communication.created_at, cast(Communication.message, Text))
+        .where(Communication.session_id == session_id)
+        .order_by(Communication.id)
+    ).all()
+    if not rows:
+        return 0
+
+    lines = []
+    for comm_id, created_at, message in rows:
+        head = json.dumps({"id": comm_id, "session_id": session_id, "created_at": created_at.isoformat()})
+        lines.append(f'{head[:-1]}, "message": {message}}}\n')
+    data = gzip.compress("".join(lines).encode())
+
+    segment, offset = writer.write(data)
+    db.add(CommunicationArchive(
+        session_id=session_id,
+        segment=segment,
+        offset=offset,
+        length=len(data),
+        message_count=len(rows),
+        first_id=rows[0].id,
+        last_id=rows[-1].id,
+    ))
+    db.execute(delete(Communication).where(Communication.session_id == session_id, Communication.id <= rows[-1].id))
+    db.commit()
+    return len(rows)
+
+
+def archive_idle_sessions(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = 500,
+                          max_sessions: Optional[int] = None) -> tuple:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    writer = SegmentWriter()
+    sessions = messages = 0
+    try:
+        with SessionLocal() as db:
+            while max_sessions is None or sessions < max_sessions:
+                remaining = batch_size if max_sessions is None else min(batch_size, max_sessions - sessions)
+                batch = idle_sessions(db, cutoff, remaining)
+                if not batch:
+                    break
+                for session_id in batch:
+                    try:
+                        messages += archive_session(db, writer, session_id)
+                        sessions += 1
+                    except Exception as e:
+                        db.rollback()
+                        print(f"Error archiving session {session_id}: {e}")
+                        return sessions, messages
+    finally:
+        writer.close()
+    return sessions, messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-sessions", type=int)
+    args = parser.parse_args()
+
+    sessions, messages = archive_idle_sessions(args.older_than_days, args.batch_size, args.max_sessions)
+    print(f"Archived {messages} messages from {sessions} sessions into {os.path.realpath(ARCHIVE_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
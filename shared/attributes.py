@@ -0,0 +1,58 @@
+"""
+Set-based writes of client attributes.
+
+Both helpers take any number of (client, template) pairs, across any number
+of clients, and run one statement per chunk of rows whatever their number.
+The callers rebuild the rules documents of the affected clients afterwards.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from shared.models import Attribute
+
+# 4 bind parameters per row keeps a chunk well under the 65535 parameters allowed per statement
+CHUNK_SIZE = 5000
+
+
+def upsert_attributes(db: Session, values: Iterable[Tuple[int, int, str]]) -> int:
+    """
+    Inserts or updates (client_id, template_id, value) triples with
+    INSERT ... ON CONFLICT DO UPDATE. Rows whose value does not change are not
+    rewritten. When a pair repeats, the last value wins. Returns the number
+    of rows written.
+    """
+    latest: Dict[Tuple[int, int], str] = {}
+    for client_id, template_id, value in values:
+        latest[(client_id, template_id)] = value
+    rows = [
+        {"client_id": client_id, "template_id": template_id, "value": value, "updated_at": datetime.utcnow()}
+        for (client_id, template_id), value in sorted(latest.items())
+    ]
+
+    written = 0
+    for start in range(0, len(rows), CHUNK_SIZE):
+        stmt = insert(Attribute).values(rows[start:start + CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Attribute.client_id, Attribute.template_id],
+            set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+            where=Attribute.value.is_distinct_from(stmt.excluded.value),
+        )
+        written += db.execute(stmt).rowcount
+    return written
+
+
+def delete_attributes(db: Session, pairs: Iterable[Tuple[int, int]]) -> int:
+    """Deletes the attributes of the given (client_id, template_id) pairs; returns how many existed."""
+    pairs = sorted(set(pairs))
+    deleted = 0
+    for start in range(0, len(pairs), CHUNK_SIZE):
+        deleted += db.execute(
+            delete(Attribute)
+            .where(tuple_(Attribute.client_id, Attribute.template_id).in_(pairs[start:start + CHUNK_SIZE]))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return deleted
@@ -0,0 +1,51 @@
+"""
+Paged reads of a session's conversation history.
+
+Pages go backwards from the newest message: `before_id` is the smallest id
+of the page already shown, and each page is read with
+`session_id = ? AND id < ? ORDER BY id DESC LIMIT n` on the
+(session_id, id) index, so its cost does not depend on conversation length.
+Pages past the oldest live message are read back from the archive.
+"""
+import os
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from shared.models import Communication
+from shared.archive import read_session
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+MAX_HISTORY_PAGE_SIZE = int(os.getenv("MAX_HISTORY_PAGE_SIZE", "500"))
+
+NEXT_BEFORE_ID_HEADER = "X-Next-Before-Id"
+
+
+def load_history(db: Session, session_id: str, before_id: Optional[int] = None,
+                 limit: Optional[int] = None) -> Tuple[List, Optional[int]]:
+    """
+    Returns up to `limit` messages older than `before_id` (the newest ones when
+    None), oldest first, and the before_id of the next page or None if there
+    are no older messages.
+    """
+    limit = limit or HISTORY_PAGE_SIZE
+    query = db.query(
+        Communication.id, Communication.session_id, Communication.message, Communication.created_at
+    ).filter(
+        Communication.session_id == session_id
+    )
+    if before_id is not None:
+        query = query.filter(Communication.id < before_id)
+
+    rows = query.order_by(Communication.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        # The live rows ran out; older messages may have been moved to cold storage
+        oldest = rows[-1].id if rows else before_id
+        rows += read_session(db, session_id, oldest, limit + 1 - len(rows))
+
+    next_before_id = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before_id = rows[-1].id
+    rows.reverse()
+    return rows, next_before_id
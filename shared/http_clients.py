@@ -0,0 +1,73 @@
+import os
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _env_float(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+def _env_int(name: str, default: str) -> int:
+    return int(os.getenv(name, default))
+
+
+def build_client() -> httpx.AsyncClient:
+    """
+    Creates a pooled AsyncClient configured from the environment.
+
+    Configuration is read when the client is built (i.e. inside the app lifespan),
+    so values loaded by load_dotenv() are honoured.
+    """
+    limits = httpx.Limits(
+        max_connections=_env_int("HTTP_MAX_CONNECTIONS", "100"),
+        max_keepalive_connections=_env_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"),
+        keepalive_expiry=_env_float("HTTP_KEEPALIVE_EXPIRY", "30"),
+    )
+    timeout = httpx.Timeout(
+        _env_float("HTTP_DEFAULT_TIMEOUT", "10"),
+        connect=_env_float("HTTP_CONNECT_TIMEOUT", "5"),
+    )
+    http2 = HTTP2_AVAILABLE and os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+class HttpClients:
+    """
+    Holds one long-lived, pooled client per upstream.
+
+    The clients are opened and closed by the application lifespan so every
+    outbound call reuses keep-alive connections instead of paying a new
+    TCP/TLS handshake per request.
+    """
+
+    def __init__(self):
+        self.webhook: httpx.AsyncClient = None
+        self.products: httpx.AsyncClient = None
+        # Explicit per-call timeouts, passed on every request
+        self.webhook_timeout = httpx.Timeout(10.0)
+        self.products_timeout = httpx.Timeout(5.0)
+
+    async def start(self):
+        self.webhook = build_client()
+        self.products = build_client()
+        self.webhook_timeout = httpx.Timeout(
+            _env_float("WEBHOOK_TIMEOUT", "10"), connect=_env_float("HTTP_CONNECT_TIMEOUT", "5")
+        )
+        self.products_timeout = httpx.Timeout(
+            _env_float("PRODUCTS_TIMEOUT", "5"), connect=_env_float("HTTP_CONNECT_TIMEOUT", "5")
+        )
+
+    async def close(self):
+        for client in (self.webhook, self.products):
+            if client is not None:
+                await client.aclose()
+        self.webhook = None
+        self.products = None
+
+
+http_clients = HttpClients()
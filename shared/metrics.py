@@ -0,0 +1,220 @@
+"""
+Lightweight Prometheus instrumentation shared by the core and agent services.
+
+Metrics are kept in plain dicts keyed by label tuples and rendered in the
+Prometheus text format on scrape; recording a sample is a dict lookup, a
+bisect and an addition under a lock, cheap enough to leave on in production.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Response
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> str:
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+        return self.header() + "".join(line + "\n" for line in lines)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        # When set, the value is read at scrape time instead of being tracked
+        self.function = function
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def render(self) -> str:
+        if self.function is not None:
+            return self.header() + f"{self.name} {self.function()}\n"
+        lines = [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+        return self.header() + "".join(line + "\n" for line in lines)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labelvalues):
+        return _Timer(self, labelvalues)
+
+    def render(self) -> str:
+        out = [self.header()]
+        for key, series in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                out.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}\n")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}\n")
+            out.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}\n")
+            out.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}\n")
+        return "".join(out)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."
+))
+DB_POOL_CHECKOUT = REGISTRY.register(Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a connection from the pool.", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+))
+
+
+def register(metric):
+    return REGISTRY.register(metric)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency and in-flight requests.
+
+    Routes are labelled with their path template (e.g. /users/{user_id}) so
+    label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status,
+            )
+
+
+def instrument_pool(engine, name: str):
+    """Times pool checkouts of a sync Engine (or the sync_engine of an AsyncEngine)."""
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - start, name)
+
+    pool._do_get = timed_do_get
+
+
+def metrics_response() -> Response:
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -57,6 +57,20 @@ class Attribute(Base):
     client = relationship("Client", back_populates="attributes")
     template = relationship("Template", back_populates="attributes")
 
+    __table_args__ = (
+        # One value per client and template; the conflict target of the bulk upserts
+        UniqueConstraint("client_id", "template_id", name="uq_attributes_client_id_template_id"),
+    )
+
+
+class ClientRules(Base):
+    __tablename__ = "client_rules"
+
+    # Denormalized, pre-encoded {template.description: attribute.value} document served by the agent RULES endpoint
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    document = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -71,9 +85,18 @@ class User(Base):
     client = relationship("Client", back_populates="users")
     communications = relationship("Communication", back_populates="user")
 
+    __table_args__ = (
+        # Keyset pages of one client's users (client_id = ? AND id > ?)
+        Index("ix_users_client_id_id", "client_id", "id"),
+        # Lets username LIKE 'prefix%' use an index whatever the database collation
+        Index("ix_users_username_pattern", "username", postgresql_ops={"username": "varchar_pattern_ops"}),
+    )
+
 
 class Communication(Base):
     __tablename__ = "communication"
+    # Range-partitioned by created_at month in the database (see alembic f7a9b1c3d468 and shared/partitions.py);
+    # the primary key there is (id, created_at), ids stay unique through the sequence
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, ForeignKey("users.session_id", ondelete="RESTRICT"), nullable=False)
@@ -81,3 +104,67 @@ class Communication(Base):
     created_at = Column(DateTime, nullable=False, server_default=func.now())
 
     user = relationship("User", back_populates="communications")
+
+    __table_args__ = (
+        # Serves per-session history reads and the WebSocket delta resync (session_id = ? AND id > ?)
+        Index("ix_communication_session_id_id", "session_id", "id"),
+    )
+
+
+# Statistics rollups, maintained by the trg_communication_rollup trigger (see alembic)
+class CommunicationDailyStats(Base):
+    __tablename__ = "communication_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    messages = Column(Integer, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)  # distinct sessions active that day
+
+
+class CommunicationSessionDay(Base):
+    __tablename__ = "communication_session_days"
+
+    # One row per session and day with messages; distinct sessions over any range are counted here
+    day = Column(Date, primary_key=True)
+    session_id = Column(String, primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        Index("ix_communication_session_days_client_id_day", "client_id", "day"),
+    )
+
+
+class CommunicationArchive(Base):
+    __tablename__ = "communication_archive"
+
+    # Where the archived messages of a session live in the cold-storage segments (see shared/archive.py)
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, nullable=False)
+    segment = Column(String, nullable=False)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_communication_archive_session_id_last_id", "session_id", "last_id"),
+    )
+
+
+class WebhookOutbox(Base):
+    __tablename__ = "webhook_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String, nullable=False, default='pending')  # pending | dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_webhook_outbox_pending", "next_attempt_at", postgresql_where=(status == 'pending')),
+    )
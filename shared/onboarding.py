@@ -0,0 +1,273 @@
+"""
+Bulk client onboarding from CSV or JSONL.
+
+The upload is parsed in one streaming pass and copied with COPY into
+temporary staging tables. Validation and the upserts of clients and
+attributes (INSERT ... ON CONFLICT) then run as a handful of set-based
+statements, whatever the number of rows. Invalid rows are skipped and
+reported with their line number; the valid ones are loaded in a single
+transaction.
+
+CSV: one client per row with columns client_code, name and optionally
+description, product_api, product_list; every other column is a template
+key whose cell is that attribute's value.
+
+JSONL: one object per line shaped like the create client payload,
+{"client_code": ..., "name": ..., "attributes": {"<template key>": "<value>"}}.
+
+    python -m shared.onboarding clients.csv [--mode insert] [--dry-run]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+from typing import BinaryIO, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from shared.notify import notify
+from shared.rules import rebuild_many_client_rules
+from shared.session_cache import CLIENT_CHANNEL
+
+CLIENT_FIELDS = ("client_code", "name", "description", "product_api", "product_list")
+MAX_REPORTED_ERRORS = 1000
+RULES_CHUNK_SIZE = 1000
+SPOOL_BYTES = int(os.getenv("IMPORT_SPOOL_BYTES", str(16 * 1024 * 1024)))
+# Largest body accepted by POST /api/clients/import
+MAX_IMPORT_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(256 * 1024 * 1024)))
+
+STAGING_TABLES = """
+CREATE TEMP TABLE import_clients (
+    line INTEGER, client_code TEXT, name TEXT, description TEXT, product_api TEXT, product_list TEXT, client_id INTEGER
+) ON COMMIT DROP;
+CREATE TEMP TABLE import_attributes (line INTEGER, template_key TEXT, value TEXT) ON COMMIT DROP;
+CREATE TEMP TABLE import_errors (line INTEGER, error TEXT) ON COMMIT DROP;
+"""
+
+# Each check records its errors; rows with an error are then dropped in one pass
+VALIDATIONS = [
+    """
+    INSERT INTO import_errors (line, error)
+    SELECT line, 'Duplicate client_code ' || client_code || ' (first at line ' || first_line || ')'
+    FROM (SELECT line, client_code, min(line) OVER (PARTITION BY client_code) AS first_line FROM import_clients) d
+    WHERE line <> first_line
+    """,
+    """
+    INSERT INTO import_errors (line, error)
+    SELECT line, 'Duplicate name ' || name || ' (first at line ' || first_line || ')'
+    FROM (SELECT line, name, min(line) OVER (PARTITION BY name) AS first_line FROM import_clients) d
+    WHERE line <> first_line
+    """,
+    """
+    INSERT INTO import_errors (line, error)
+    SELECT s.line, 'Name ' || s.name || ' is already used by client ' || c.client_code
+    FROM import_clients s
+    JOIN clients c ON c.name = s.name AND c.client_code <> s.client_code
+    """,
+]
+
+INSERT_ONLY_VALIDATION = """
+INSERT INTO import_errors (line, error)
+SELECT s.line, 'Client with code ' || s.client_code || ' already exists'
+FROM import_clients s
+JOIN clients c ON c.client_code = s.client_code
+"""
+
+UNKNOWN_TEMPLATES = """
+WITH unknown AS (
+    DELETE FROM import_attributes a
+    WHERE NOT EXISTS (SELECT 1 FROM templates t WHERE t.key = a.template_key)
+    RETURNING line, template_key
+)
+INSERT INTO import_errors (line, error)
+SELECT line, 'Unknown template key ' || template_key || ' (attribute skipped)' FROM unknown
+"""
+
+DROP_INVALID = """
+DELETE FROM import_clients s USING import_errors e WHERE s.line = e.line;
+DELETE FROM import_attributes a WHERE NOT EXISTS (SELECT 1 FROM import_clients s WHERE s.line = a.line);
+"""
+
+# Fields missing from the file (NULL) keep their current value on update
+UPSERT_CLIENTS = """
+WITH upserted AS (
+    INSERT INTO clients (client_code, name, description, status, product_api, product_list)
+    SELECT client_code, name, description, 'Activo', product_api, product_list
+    FROM import_clients
+    ORDER BY client_code
+    ON CONFLICT (client_code) DO UPDATE
+    SET name = EXCLUDED.name,
+        description = coalesce(EXCLUDED.description, clients.description),
+        product_api = coalesce(EXCLUDED.product_api, clients.product_api),
+        product_list = coalesce(EXCLUDED.product_list, clients.product_list)
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+"""
+
+RESOLVE_CLIENT_IDS = """
+UPDATE import_clients s SET client_id = c.id FROM clients c WHERE c.client_code = s.client_code
+"""
+
+ATTRIBUTE_VALUES = """
+CREATE TEMP TABLE import_attribute_values ON COMMIT DROP AS
+SELECT DISTINCT ON (s.client_id, t.id) s.client_id, t.id AS template_id, a.value
+FROM import_attributes a
+JOIN import_clients s ON s.line = a.line
+JOIN templates t ON t.key = a.template_key
+ORDER BY s.client_id, t.id
+"""
+
+UPSERT_ATTRIBUTES = """
+WITH upserted AS (
+    INSERT INTO attributes (client_id, template_id, value, updated_at)
+    SELECT client_id, template_id, value, now() AT TIME ZONE 'utc'
+    FROM import_attribute_values
+    ON CONFLICT (client_id, template_id) DO UPDATE
+    SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+    WHERE attributes.value IS DISTINCT FROM EXCLUDED.value
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+"""
+
+
+class _Staging:
+    """Spools staging rows as CSV for COPY, keeping memory bounded."""
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+
+    def copy_to(self, cursor, table: str, columns: str):
+        self.file.seek(0)
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", self.file)
+        self.file.close()
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def stage_rows(upload: BinaryIO, fmt: str, clients: _Staging, attributes: _Staging, errors: List[Dict]) -> int:
+    """Parses the upload into the staging files; returns the number of client rows read."""
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    count = 0
+
+    def add(line: int, record: dict, attribute_values: dict):
+        nonlocal count
+        count += 1
+        code, name = _clean(record.get("client_code")), _clean(record.get("name"))
+        if not code or not name:
+            errors.append({"line": line, "error": "client_code and name are required"})
+            return
+        clients.writer.writerow([line, code, name, *(_clean(record.get(field)) for field in CLIENT_FIELDS[2:])])
+        for key, value in attribute_values.items():
+            value = _clean(value)
+            if value:
+                attributes.writer.writerow([line, key, value])
+
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        attribute_columns = [column for column in reader.fieldnames or [] if column not in CLIENT_FIELDS]
+        for record in reader:
+            add(reader.line_num, record, {column: record.get(column) for column in attribute_columns})
+    else:
+        for line, raw in enumerate(stream, start=1):
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+                if not isinstance(record, dict) or not isinstance(record.get("attributes", {}), dict):
+                    raise ValueError("expected an object with an optional attributes object")
+            except ValueError as e:
+                count += 1
+                errors.append({"line": line, "error": f"Invalid JSON: {e}"})
+                continue
+            add(line, record, record.get("attributes") or {})
+    stream.detach()
+    return count
+
+
+def import_clients(db: Session, upload: BinaryIO, fmt: str = "csv", mode: str = "upsert", dry_run: bool = False) -> dict:
+    """Loads an upload of clients and attributes; returns the counts and the per-row errors."""
+    errors: List[Dict] = []
+    clients, attributes = _Staging(), _Staging()
+    rows = stage_rows(upload, fmt, clients, attributes, errors)
+
+    db.execute(text(STAGING_TABLES))
+    with db.connection().connection.cursor() as cursor:
+        clients.copy_to(cursor, "import_clients", "line, client_code, name, description, product_api, product_list")
+        attributes.copy_to(cursor, "import_attributes", "line, template_key, value")
+
+    for statement in VALIDATIONS + ([INSERT_ONLY_VALIDATION] if mode == "insert" else []):
+        db.execute(text(statement))
+    db.execute(text(DROP_INVALID))
+    db.execute(text(UNKNOWN_TEMPLATES))
+
+    created, updated = db.execute(text(UPSERT_CLIENTS)).one()
+    db.execute(text(RESOLVE_CLIENT_IDS))
+    db.execute(text(ATTRIBUTE_VALUES))
+    attributes_created, attributes_updated = db.execute(text(UPSERT_ATTRIBUTES)).one()
+
+    client_ids = list(db.execute(text("SELECT client_id FROM import_clients")).scalars())
+    rebuild_many_client_rules(db, client_ids, RULES_CHUNK_SIZE, notify_threshold=0)
+    if client_ids:
+        # One full invalidation instead of a NOTIFY per client
+        notify(db, CLIENT_CHANNEL)
+
+    error_count = db.execute(text("SELECT count(*) FROM import_errors")).scalar_one() + len(errors)
+    errors.extend(
+        {"line": line, "error": error}
+        for line, error in db.execute(text("SELECT line, error FROM import_errors ORDER BY line LIMIT :limit"),
+                                      {"limit": MAX_REPORTED_ERRORS})
+    )
+    errors.sort(key=lambda e: e["line"])
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+
+    return {
+        "rows": rows,
+        "clients_created": created,
+        "clients_updated": updated,
+        "attributes_created": attributes_created,
+        "attributes_updated": attributes_updated,
+        "error_count": error_count,
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "dry_run": dry_run,
+    }
+
+
+def detect_format(filename: str = "", content_type: str = "") -> str:
+    if filename.endswith((".jsonl", ".ndjson")) or "json" in content_type:
+        return "jsonl"
+    return "csv"
+
+
+def main():
+    from shared.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--mode", choices=["upsert", "insert"], default="upsert",
+                        help="insert reports existing client codes as errors instead of updating them")
+    parser.add_argument("--dry-run", action="store_true", help="validate and report without saving")
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as upload, SessionLocal() as db:
+        report = import_clients(db, upload, args.format or detect_format(args.file), args.mode, args.dry_run)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
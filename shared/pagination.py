@@ -0,0 +1,75 @@
+"""
+Keyset (seek) pagination for the core list endpoints.
+
+Pages are ordered by primary key and continued with `WHERE id > :last_id`,
+so every page costs the same index range scan however deep it is. Bodies
+stay plain JSON arrays for compatibility; the continuation cursor and the
+optional total are returned in the X-Next-Cursor and X-Total-Count headers.
+Without `limit` a page of DEFAULT_PAGE_SIZE rows is returned; clients that
+need the whole list follow X-Next-Cursor.
+"""
+import base64
+import json
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+DEFAULT_PAGE_SIZE = min(int(os.getenv("DEFAULT_PAGE_SIZE", "100")), MAX_PAGE_SIZE)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+def starts_with(column, prefix: str):
+    """`column LIKE 'prefix%'` with the pattern built client-side, so the planner sees a constant prefix."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.like(escaped + "%", escape="\\")
+
+
+class PageParams:
+    """Query parameters shared by the paginated list endpoints."""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ):
+        self.limit = limit or DEFAULT_PAGE_SIZE
+        self.cursor = cursor
+        self.include_total = include_total
+
+
+def paginate(query, key_column, response: Response, page: PageParams) -> list:
+    """Applies the cursor and limit of `page` to `query`, ordered by `key_column`."""
+    if page.include_total:
+        total = query.enable_eagerloads(False).order_by(None).count()
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+
+    if page.cursor:
+        query = query.filter(key_column > decode_cursor(page.cursor))
+    query = query.order_by(key_column)
+
+    # One extra row tells whether there is a next page without a second query
+    rows = query.limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(rows[-1], key_column.key))
+    return rows
@@ -0,0 +1,129 @@
+"""
+Maintenance of the monthly partitions of `communication`.
+
+Creates the partitions for the coming months (inserts into a month without a
+partition fail) and detaches the ones past the retention period, so old rows
+leave every query plan and autovacuum pass on the parent. Detached partitions
+are kept as standalone tables unless --drop is given.
+
+Run it from cron, e.g. daily:
+
+    python -m shared.partitions --ahead 3 --retain-months 24
+"""
+import argparse
+import os
+import re
+from datetime import date
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+
+from shared.database import engine
+
+PARENT = "communication"
+PARTITIONS_AHEAD = int(os.getenv("COMMUNICATION_PARTITIONS_AHEAD", "3"))
+
+_BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    lower: Optional[date]  # None for MINVALUE
+    upper: Optional[date]  # None for MAXVALUE
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month_start: date) -> str:
+    return f"{PARENT}_y{month_start:%Y}m{month_start:%m}"
+
+
+def _parse_bound(value: str) -> Optional[date]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return date.fromisoformat(value.strip("'")[:10])
+
+
+def list_partitions(conn) -> List[Partition]:
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:parent AS regclass)
+    """), {"parent": PARENT}).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound or "")
+        if match:
+            partitions.append(Partition(name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return sorted(partitions, key=lambda p: (p.lower is not None, p.lower))
+
+
+def ensure_partitions(conn, months_ahead: int = PARTITIONS_AHEAD, today: Optional[date] = None) -> List[str]:
+    """
+    Creates the missing partitions from the current month to `months_ahead`
+    months after it. Does nothing while the table is not partitioned yet.
+    """
+    today = today or date.today()
+    partitions = list_partitions(conn)
+    if not partitions:
+        return []
+    covered_until = max((p.upper for p in partitions if p.upper is not None), default=None)
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month_start = add_months(today.replace(day=1), offset)
+        if covered_until is not None and month_start < covered_until:
+            continue
+        name = partition_name(month_start)
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT} '
+            f"FOR VALUES FROM ('{month_start}') TO ('{add_months(month_start, 1)}')"
+        ))
+        created.append(name)
+    return created
+
+
+def detach_expired(conn, retain_months: int, drop: bool = False, today: Optional[date] = None) -> List[str]:
+    """Detaches (or drops) the partitions whose rows are all older than the retention period."""
+    today = today or date.today()
+    cutoff = add_months(today.replace(day=1), -retain_months)
+
+    detached = []
+    for partition in list_partitions(conn):
+        if partition.upper is None or partition.upper > cutoff:
+            continue
+        conn.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION "{partition.name}"'))
+        if drop:
+            conn.execute(text(f'DROP TABLE "{partition.name}"'))
+        detached.append(partition.name)
+    return detached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ahead", type=int, default=PARTITIONS_AHEAD, help="months to create ahead of the current one")
+    parser.add_argument("--retain-months", type=int, help="detach partitions older than this many months")
+    parser.add_argument("--drop", action="store_true", help="drop expired partitions instead of keeping them as tables")
+    parser.add_argument("--list", action="store_true", help="only print the current partitions")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        if args.list:
+            for partition in list_partitions(conn):
+                print(f"{partition.name}: {partition.lower or 'MINVALUE'} -> {partition.upper or 'MAXVALUE'}")
+            return
+
+        for name in ensure_partitions(conn, args.ahead):
+            print(f"Created partition {name}")
+        if args.retain_months is not None:
+            for name in detach_expired(conn, args.retain_months, args.drop):
+                print(f"{'Dropped' if args.drop else 'Detached'} partition {name}")
+
+
+if __name__ == "__main__":
+    main()
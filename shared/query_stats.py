@@ -0,0 +1,104 @@
+"""
+Per-request SQL accounting on top of SQLAlchemy engine events.
+
+Counts statements and DB time for each request, flags statements repeated
+within one request (the N+1 pattern) and logs slow queries with their bound
+parameters. The current request is tracked in a ContextVar, which FastAPI
+copies into the threadpool for sync routes and SQLAlchemy carries into the
+greenlets of the async engine.
+"""
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# A statement run this many times in one request is reported as a likely N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+# "header" adds X-DB-* response headers, "log" prints one line per request, "both" does both
+QUERY_STATS = os.getenv("QUERY_STATS", "off").lower()
+
+_MAX_LOGGED_CHARS = 500
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self):
+        return [(statement, n) for statement, n in self.statements.items() if n >= QUERY_REPEAT_THRESHOLD]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _shorten(value) -> str:
+    text = " ".join(str(value).split())
+    return text if len(text) <= _MAX_LOGGED_CHARS else text[:_MAX_LOGGED_CHARS] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration * 1000 >= SLOW_QUERY_MS:
+        print(f"Slow query ({duration * 1000:.1f} ms): {_shorten(statement)} params={_shorten(parameters)}")
+
+
+def instrument_engine(engine):
+    """Registers the accounting hooks on a sync Engine (or the sync_engine of an AsyncEngine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware opening a QueryStats scope for each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or QUERY_STATS == "off":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and QUERY_STATS in ("header", "both"):
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.duration * 1000:.1f}".encode()))
+                repeated = stats.repeated()
+                if repeated:
+                    headers.append((b"x-db-repeated", str(max(n for _, n in repeated)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            path = scope.get("route").path if scope.get("route") is not None else scope["path"]
+            if QUERY_STATS in ("log", "both"):
+                print(f"{scope['method']} {path}: {stats.count} queries, {stats.duration * 1000:.1f} ms in DB")
+            for statement, n in stats.repeated():
+                print(f"Possible N+1 in {scope['method']} {path}: statement ran {n} times: {_shorten(statement)}")
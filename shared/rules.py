@@ -0,0 +1,133 @@
+import json
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from shared.models import Attribute, ClientRules, Template
+from shared.notify import notify
+
+RULES_CHANNEL = "rules_changed"
+
+
+def encode_rules(document: dict) -> bytes:
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def build_rules_documents(db: Session, client_ids: Iterable[int]) -> Dict[int, dict]:
+    """Runs the Template/Attribute join once for all the given clients."""
+    client_ids = list(client_ids)
+    documents = {client_id: {} for client_id in client_ids}
+    if not client_ids:
+        return documents
+
+    rows = db.query(
+        Attribute.client_id,
+        Template.description,
+        Attribute.value
+    ).join(
+        Template, Template.id == Attribute.template_id
+    ).filter(
+        Attribute.client_id.in_(client_ids)
+    ).order_by(Attribute.client_id, Attribute.id).all()
+
+    for client_id, description, value in rows:
+        documents[client_id][description] = value
+    return documents
+
+
+def rebuild_client_rules(db: Session, client_ids: Iterable[int], notify_each: bool = True) -> Dict[int, dict]:
+    """
+    Re-materializes the rules document of the given clients.
+
+    Must be called inside the transaction that changed the attributes (after a
+    flush); the upsert and the NOTIFY to the agent commit together with it.
+    Bulk callers pass notify_each=False and send a single empty-payload NOTIFY
+    (clear everything) instead of one per client.
+    """
+    documents = build_rules_documents(db, set(client_ids))
+    if not documents:
+        return documents
+
+    stmt = insert(ClientRules).values([
+        {"client_id": client_id, "document": encode_rules(document).decode("utf-8")}
+        for client_id, document in documents.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ClientRules.client_id],
+        set_={"document": stmt.excluded.document, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt)
+    if notify_each:
+        for client_id in documents:
+            notify(db, RULES_CHANNEL, str(client_id))
+    return documents
+
+
+def rebuild_many_client_rules(db: Session, client_ids: Iterable[int], chunk_size: int = 1000,
+                              notify_threshold: int = 100):
+    """
+    rebuild_client_rules for an arbitrary number of clients, in chunks. Past
+    `notify_threshold` clients a single empty-payload NOTIFY (clear everything)
+    replaces the per-client ones.
+    """
+    client_ids = sorted(set(client_ids))
+    notify_each = len(client_ids) <= notify_threshold
+    for start in range(0, len(client_ids), chunk_size):
+        rebuild_client_rules(db, client_ids[start:start + chunk_size], notify_each=notify_each)
+    if client_ids and not notify_each:
+        notify(db, RULES_CHANNEL)
+
+
+def client_ids_for_template(db: Session, template_id: int) -> List[int]:
+    rows = db.query(Attribute.client_id).filter(Attribute.template_id == template_id).distinct().all()
+    return [client_id for (client_id,) in rows]
+
+
+class RulesCache:
+    """
+    In-memory map of client_id -> pre-encoded rules document.
+
+    Misses read the materialized row from client_rules (building it if it does
+    not exist yet); entries are dropped when a NOTIFY on RULES_CHANNEL arrives.
+    """
+
+    def __init__(self):
+        self.documents: Dict[int, bytes] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load racing with a rebuild is not kept
+        self._generation = 0
+
+    async def get(self, db: AsyncSession, client_id: int) -> bytes:
+        content = self.documents.get(client_id)
+        if content is not None:
+            return content
+
+        generation = self._generation
+        result = await db.execute(select(ClientRules.document).where(ClientRules.client_id == client_id))
+        document = result.scalar_one_or_none()
+        if document is not None:
+            content = document.encode("utf-8")
+        else:
+            documents = await db.run_sync(rebuild_client_rules, [client_id])
+            await db.commit()
+            content = encode_rules(documents[client_id])
+
+        with self._lock:
+            if generation == self._generation:
+                self.documents[client_id] = content
+        return content
+
+    def invalidate(self, payload: Optional[str] = None):
+        with self._lock:
+            self._generation += 1
+            if payload:
+                self.documents.pop(int(payload), None)
+            else:
+                self.documents.clear()
+
+
+rules_cache = RulesCache()
@@ -0,0 +1,136 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.models import Client, User
+
+SESSION_CHANNEL = "session_changed"
+CLIENT_CHANNEL = "client_changed"
+
+
+class SessionRecord:
+    __slots__ = ("user_id", "client_id", "client_status")
+
+    def __init__(self, user_id: int, client_id: int, client_status: str):
+        self.user_id = user_id
+        self.client_id = client_id
+        self.client_status = client_status
+
+
+class ClientRecord:
+    __slots__ = ("id", "status", "description", "product_api", "product_list")
+
+    def __init__(self, id: int, status: str, description: Optional[str],
+                 product_api: Optional[str], product_list: Optional[str]):
+        self.id = id
+        self.status = status
+        self.description = description
+        self.product_api = product_api
+        self.product_list = product_list
+
+
+class SessionCache:
+    """
+    Bounded LRU of session_id -> SessionRecord, plus a small map of the client
+    fields the agent tool endpoints need.
+
+    Entries are filled on first use and evicted when the core service NOTIFYs
+    SESSION_CHANNEL (user updates, payload session_id) or CLIENT_CHANNEL
+    (client updates, payload client id). It is meant to be used from the event
+    loop thread only.
+
+    Measured with benchmarks/session_cache_memory.py (CPython 3.11, 64-bit),
+    each cached session costs ~270 bytes: 56 for the SessionRecord, 85 for the
+    36-char session id string and ~130 for the OrderedDict slot, its link and
+    the user id int. 1M sessions take ~260 MiB.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self.clients: Dict[int, ClientRecord] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped on every invalidation so a miss racing with a NOTIFY does not store a stale record
+        self._generation = 0
+
+    async def get_session(self, db: AsyncSession, session_id: str) -> Optional[SessionRecord]:
+        record = self.sessions.get(session_id)
+        if record is not None:
+            self.sessions.move_to_end(session_id)
+            self.hits += 1
+            return record
+
+        self.misses += 1
+        generation = self._generation
+        result = await db.execute(
+            select(User.id, User.client_id, Client.status)
+            .join(Client, Client.id == User.client_id)
+            .where(User.session_id == session_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        record = SessionRecord(row[0], row[1], row[2])
+        if generation != self._generation:
+            return record
+        self.sessions[session_id] = record
+        if len(self.sessions) > self.maxsize:
+            self.sessions.popitem(last=False)
+            self.evictions += 1
+        return record
+
+    async def get_client(self, db: AsyncSession, client_id: int) -> Optional[ClientRecord]:
+        record = self.clients.get(client_id)
+        if record is not None:
+            return record
+
+        generation = self._generation
+        client = await db.get(Client, client_id)
+        if client is None:
+            return None
+
+        record = ClientRecord(client.id, client.status, client.description, client.product_api, client.product_list)
+        if generation == self._generation:
+            self.clients[client_id] = record
+        return record
+
+    def invalidate_session(self, payload: Optional[str] = None):
+        self._generation += 1
+        if payload:
+            self.sessions.pop(payload, None)
+        else:
+            self.sessions.clear()
+            self.clients.clear()
+
+    def invalidate_client(self, payload: Optional[str] = None):
+        self._generation += 1
+        if not payload:
+            self.sessions.clear()
+            self.clients.clear()
+            return
+
+        client_id = int(payload)
+        self.clients.pop(client_id, None)
+        # Client changes are rare; a scan is cheaper than a per-entry reverse index
+        stale = [session_id for session_id, record in self.sessions.items() if record.client_id == client_id]
+        for session_id in stale:
+            del self.sessions[session_id]
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "clients": len(self.clients),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+session_cache = SessionCache(maxsize=int(os.getenv("SESSION_CACHE_SIZE", "100000")))
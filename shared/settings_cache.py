@@ -0,0 +1,90 @@
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from shared.database import SessionLocal
+from shared.models import Setting
+
+SETTINGS_CHANNEL = "settings_changed"
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    url_agent: Optional[str] = None
+    url_host: Optional[str] = None
+    values: Dict[str, str] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.values.get(key, default)
+
+
+class SettingsCache:
+    """
+    In-memory snapshot of the settings table.
+
+    The snapshot is loaded once and served from memory until it is invalidated
+    (by a NOTIFY on SETTINGS_CHANNEL or a local write) or its TTL expires. The
+    TTL is only a safety net for missed notifications.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._snapshot: Optional[SettingsSnapshot] = None
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a reload racing with a write is not kept
+        self._generation = 0
+
+    def _ttl(self) -> float:
+        return self.ttl if self.ttl is not None else float(os.getenv("SETTINGS_CACHE_TTL", "300"))
+
+    def current(self) -> Optional[SettingsSnapshot]:
+        """Returns the snapshot if it is still fresh, without touching the database."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self._ttl():
+            return snapshot
+        return None
+
+    def get(self) -> SettingsSnapshot:
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            snapshot = self.current()
+            if snapshot is None:
+                generation = self._generation
+                snapshot = self._load()
+                if generation == self._generation:
+                    self._snapshot = snapshot
+            return snapshot
+
+    async def aget(self) -> SettingsSnapshot:
+        """Async variant: a reload runs in a worker thread so the event loop never blocks."""
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+        return await asyncio.to_thread(self.get)
+
+    def invalidate(self, payload: Optional[str] = None):
+        self._generation += 1
+        self._snapshot = None
+
+    @staticmethod
+    def _load() -> SettingsSnapshot:
+        db = SessionLocal()
+        try:
+            values = {key: value for key, value in db.query(Setting.key, Setting.value).all()}
+        finally:
+            db.close()
+        return SettingsSnapshot(
+            url_agent=values.get("URL_AGENT"),
+            url_host=values.get("URL_HOST"),
+            values=values,
+            loaded_at=time.monotonic(),
+        )
+
+
+settings_cache = SettingsCache()